@@ -0,0 +1,156 @@
+"""Headless HTTP API for DAOAgent and ImageService.
+
+    POST /query        {"query": ..., "style": ...}  -> agent result, images by id
+    POST /image        {"prompt": ..., "style": ..., "model": ...} -> image id
+    GET  /image/{id}   stored image bytes
+    GET  /health
+
+Images are written to the shared on-disk image store and referenced by
+their content hash, so any worker can serve an image another one generated.
+
+    python -m app.api --workers 4 --port 8000
+"""
+import base64
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from app.config import API_HOST, API_PORT, API_WORKERS
+from app.services.http_client import close_http_client
+from app.services.image_service import ImageService, VeniceAiModelsEnum, VeniceAiModelStyles
+from app.services.image_store import get_image_store
+from app.services.providers import get_agent, get_image_service
+
+STYLES = {style.value for style in VeniceAiModelStyles}
+MODELS = {model.value for model in VeniceAiModelsEnum}
+DEFAULT_STYLE = VeniceAiModelStyles.THREE_D_MODEL.value
+IMAGE_SIGNATURES = [
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"RIFF", "image/webp"),
+]
+
+
+def _mime_type(data: bytes) -> str:
+    for signature, mime in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime
+    return "application/octet-stream"
+
+
+async def _image_ref(data: bytes, mime: str = None) -> dict:
+    """Store image bytes and describe them by id; inline them if the store is disabled"""
+    store = get_image_store()
+    mime = mime or _mime_type(data)
+    if store is None:
+        return {"mime": mime, "data": base64.b64encode(data).decode("ascii")}
+    image_id = await asyncio.to_thread(store.put_blob, data)
+    return {"id": image_id, "url": f"/image/{image_id}", "mime": mime}
+
+
+async def _json_body(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({"success": False, "error": message}, status_code=status)
+
+
+async def query(request: Request) -> JSONResponse:
+    body = await _json_body(request)
+    if not body or not str(body.get("query") or "").strip():
+        return _error(400, "Body must be JSON with a non-empty \"query\"")
+    style = body.get("style") or DEFAULT_STYLE
+    if style not in STYLES:
+        return _error(400, f"Unknown style: {style}")
+
+    result = await get_agent().process_query(body["query"], style)
+
+    # Bytes go to the image store; the response only carries ids
+    image = result.pop("image", None)
+    renditions = result.pop("image_renditions", None)
+    result["image"] = await _image_ref(image) if image else None
+    if image and renditions:
+        result["image"]["renditions"] = {
+            name: await _image_ref(renditions[name], renditions["mime"])
+            for name in ("display", "thumbnail")
+        }
+    return JSONResponse(result, status_code=200 if result["success"] else 502)
+
+
+async def image(request: Request) -> JSONResponse:
+    body = await _json_body(request)
+    if not body or not str(body.get("prompt") or "").strip():
+        return _error(400, "Body must be JSON with a non-empty \"prompt\"")
+    style = body.get("style") or DEFAULT_STYLE
+    if style not in STYLES:
+        return _error(400, f"Unknown style: {style}")
+    model = body.get("model")
+    if model and model not in MODELS:
+        return _error(400, f"Unknown model: {model}")
+
+    service = ImageService(model) if model else get_image_service()
+    data = await service.generate_image(body["prompt"], style)
+    if data is None:
+        return _error(502, "Image generation failed")
+    return JSONResponse({"success": True, "image": await _image_ref(data)})
+
+
+async def get_image(request: Request) -> Response:
+    store = get_image_store()
+    image_id = request.path_params["image_id"]
+    data = await asyncio.to_thread(store.get_blob, image_id) if store else None
+    if data is None:
+        return _error(404, "Image not found")
+    if request.headers.get("if-none-match") == f'"{image_id}"':
+        return Response(status_code=304)
+    # Ids are content hashes, so a given URL never changes
+    headers = {"ETag": f'"{image_id}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    return Response(data, media_type=_mime_type(data), headers=headers)
+
+
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Each worker builds its services once and reuses their pooled clients
+    get_agent()
+    yield
+    await close_http_client()
+
+
+app = Starlette(
+    routes=[
+        Route("/query", query, methods=["POST"]),
+        Route("/image", image, methods=["POST"]),
+        Route("/image/{image_id}", get_image, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the DAO agent over HTTP")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run("app.api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Batch runner: stream DAO queries from a JSONL file through DAOAgent.
+
+Each input line is a JSON object with a "query" and optional "id" and
+"style". Results are appended to the output JSONL as they finish, and the
+output file doubles as the checkpoint: rerunning with the same output skips
+every id recorded as completed, i.e. answered with its image saved (or
+answered without one being due, e.g. a non-DAO query). Items whose image
+failed to render are retried. Malformed input lines are logged and written
+as failed records.
+
+    python -m app.batch daos.jsonl results.jsonl --images-dir images --concurrency 4
+"""
+import os
+import json
+import asyncio
+import argparse
+
+from app.services.agent_service import DAOAgent
+from app.services.providers import get_agent
+from app.services.metrics import start_metrics_server
+from app.services.scheduler import BATCH, request_class
+
+DEFAULT_STYLE = "3D Model"
+
+
+def load_completed(output_path: str) -> set:
+    """Ids already written to the output file as completed"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                continue
+            if record.get("completed"):
+                completed.add(record["id"])
+    return completed
+
+
+def iter_items(input_path: str, completed: set):
+    """Yield pending items one line at a time"""
+    with open(input_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                if not isinstance(item, dict) or not str(item.get("query") or "").strip():
+                    raise ValueError("expected a JSON object with a \"query\"")
+            except ValueError as e:
+                print(f"Skipping input line {line_number}: {str(e)}: {line.strip()[:200]}")
+                yield {"id": f"line-{line_number}", "query": None, "style": None, "error": f"Invalid input line: {str(e)}"}
+                continue
+            item_id = str(item.get("id") or f"line-{line_number}")
+            if item_id in completed:
+                continue
+            yield {
+                "id": item_id,
+                "query": item["query"],
+                "style": item.get("style") or DEFAULT_STYLE
+            }
+
+
+class BatchRunner:
+    """Runs items through the agent with a fixed number of workers"""
+
+    def __init__(self, agent: DAOAgent, output_path: str, images_dir: str, concurrency: int = 4):
+        self.agent = agent
+        self.output_path = output_path
+        self.images_dir = images_dir
+        self.concurrency = concurrency
+        self.succeeded = 0
+        self.failed = 0
+        os.makedirs(images_dir, exist_ok=True)
+
+    def _write_image(self, item_id: str, image: bytes) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_." else "_" for c in item_id)
+        path = os.path.join(self.images_dir, f"{safe_id}.png")
+        with open(path, "wb") as f:
+            f.write(image)
+        return path
+
+    async def _process(self, item: dict, output) -> None:
+        if item.get("error"):
+            result = {"success": False, "error": item["error"]}
+        else:
+            # Queue behind interactive users for the shared upstream quotas
+            request_class.set(BATCH)
+            result = await self.agent.process_query(query=item["query"], style=item["style"])
+        image_path = None
+        if result.get("image"):
+            image_path = await asyncio.to_thread(self._write_image, item["id"], result["image"])
+        # An image prompt without an image means the render failed; retry it on resume
+        completed = result["success"] and (image_path is not None or result.get("image_prompt") is None)
+
+        record = {
+            "id": item["id"],
+            "query": item["query"],
+            "style": item["style"],
+            "success": result["success"],
+            "completed": completed,
+            "summary": result.get("response"),
+            "urls": (result.get("dao_info") or {}).get("urls", []),
+            "image_prompt": result.get("image_prompt"),
+            "image_path": image_path,
+            "error": result.get("error") or (None if completed else "Image generation failed")
+        }
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        os.fsync(output.fileno())
+
+        if completed:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        print(f"[{self.succeeded + self.failed}] {item['id']}: {'ok' if completed else 'failed'}")
+
+    async def _worker(self, queue: asyncio.Queue, output) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                await self._process(item, output)
+            except Exception as e:
+                self.failed += 1
+                print(f"Batch item {item['id']} failed: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def run(self, items) -> None:
+        # A small bounded queue keeps memory flat no matter how large the input is
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        with open(self.output_path, "a", encoding="utf-8") as output:
+            workers = [asyncio.create_task(self._worker(queue, output)) for _ in range(self.concurrency)]
+            for item in items:
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run DAO queries from a JSONL file through the agent")
+    parser.add_argument("input", help="JSONL file with one {\"query\", \"id\"?, \"style\"?} per line")
+    parser.add_argument("output", help="JSONL file results are appended to; also used to resume")
+    parser.add_argument("--images-dir", default="batch_images", help="Directory for generated images")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries processed at once")
+    args = parser.parse_args()
+
+    completed = load_completed(args.output)
+    if completed:
+        print(f"Resuming: {len(completed)} items already done")
+
+    agent = get_agent()
+    start_metrics_server()
+    runner = BatchRunner(agent, args.output, args.images_dir, args.concurrency)
+    asyncio.run(runner.run(iter_items(args.input, completed)))
+    print(f"Done: {runner.succeeded} succeeded, {runner.failed} failed")
+
+
+if __name__ == "__main__":
+    main()
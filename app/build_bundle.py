@@ -0,0 +1,79 @@
+"""Build the warm bundle: precomputed answers and images for the top DAOs.
+
+Runs the full agent pipeline once per DAO and style and writes the results
+to WARM_BUNDLE_DIR (index.json + images.bin). Every app process maps the
+bundle at startup and answers those DAOs without calling upstream.
+
+    python -m app.build_bundle --top 20 --styles "3D Model,Anime"
+    python -m app.build_bundle --daos "Uniswap,Aave" --out /srv/warm_bundle
+"""
+import json
+import asyncio
+import argparse
+
+from app.config import KNOWN_DAOS_PATH, WARM_BUNDLE_DIR
+from app.services.providers import get_agent
+from app.services.scheduler import BATCH, request_class
+from app.services.warm_bundle import BundleWriter
+
+DEFAULT_STYLE = "3D Model"
+
+
+def select_daos(path: str, names: list, top: int) -> list:
+    """Known-DAO entries to build, by name or the first `top` in the file"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)["daos"]
+    if names:
+        by_name = {entry["name"].lower(): entry for entry in entries}
+        return [by_name.get(name.lower(), {"name": name, "aliases": []}) for name in names]
+    return entries[:top]
+
+
+async def build(daos: list, styles: list, writer: BundleWriter, concurrency: int) -> int:
+    agent = get_agent()
+    # Build from fresh upstream results, not from caches or an older bundle
+    agent.query_cache = None
+    agent.bundle = None
+    slots = asyncio.Semaphore(concurrency)
+    built = 0
+
+    async def one(dao: dict, style: str):
+        nonlocal built
+        query = f"Tell me about {dao['name']}"
+        async with slots:
+            request_class.set(BATCH)
+            result = await agent.process_query(query, style)
+        if result["success"] and result.get("image"):
+            writer.add(query, style, result, aliases=[dao["name"], *dao.get("aliases", [])],
+                       ambiguous=dao.get("ambiguous", []))
+            built += 1
+            print(f"{dao['name']} [{style}]: ok")
+        else:
+            print(f"{dao['name']} [{style}]: skipped ({result.get('error') or 'no image'})")
+
+    await asyncio.gather(*(one(dao, style) for dao in daos for style in styles))
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute answers and images for the top DAOs")
+    parser.add_argument("--daos", help="comma separated DAO names (default: the first --top known DAOs)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--styles", default=DEFAULT_STYLE, help="comma separated art styles")
+    parser.add_argument("--known-daos", default=KNOWN_DAOS_PATH)
+    parser.add_argument("--out", default=WARM_BUNDLE_DIR)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in (args.daos or "").split(",") if name.strip()]
+    styles = [style.strip() for style in args.styles.split(",") if style.strip()]
+    daos = select_daos(args.known_daos, names, args.top)
+
+    writer = BundleWriter(args.out)
+    built = asyncio.run(build(daos, styles, writer, args.concurrency))
+    writer.close()
+    print(f"Wrote {built} of {len(daos) * len(styles)} entries to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
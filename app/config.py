@@ -1,7 +1,6 @@
 import os
 from dotenv import load_dotenv
 import logging
-import streamlit as st
 
 # Load environment variables
 load_dotenv()
@@ -10,9 +9,141 @@ load_dotenv()
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 VENICE_API_KEY = os.getenv("VENICE_API_KEY")
 
+# Upstream endpoints; override to point at a local stand-in (scripts/stub_upstreams.py)
+VENICE_API_BASE = os.getenv("VENICE_API_BASE", "https://api.venice.ai/api/v1").rstrip("/")
+TAVILY_API_BASE = os.getenv("TAVILY_API_BASE", "").rstrip("/")
+
 # Constants
 PLACEHOLDER_IMAGE_URL = "https://via.placeholder.com/512x512.png?text=DAO+Image"
 
+# HTTP connection pool shared by the Venice services
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "120"))
+
+# LLM response cache (memory LRU in front of SQLite)
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite"))
+LLM_CACHE_TTL_CLASSIFY = float(os.getenv("LLM_CACHE_TTL_CLASSIFY", str(7 * 24 * 3600)))
+LLM_CACHE_TTL_CREATIVE = float(os.getenv("LLM_CACHE_TTL_CREATIVE", str(24 * 3600)))
+# Comma separated stages that always go to the API, e.g. "image_idea,image_prompt"
+LLM_CACHE_BYPASS = [s.strip() for s in os.getenv("LLM_CACHE_BYPASS", "").split(",") if s.strip()]
+
+# Content-addressed store for generated images; 0 disables it
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(CACHE_DIR, "images"))
+IMAGE_STORE_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Ask Venice for raw image bytes instead of base64 JSON
+IMAGE_RETURN_BINARY = os.getenv("IMAGE_RETURN_BINARY", "true").lower() == "true"
+# Browser renditions of generated images (original is kept for download)
+IMAGE_RENDITIONS = os.getenv("IMAGE_RENDITIONS", "true").lower() == "true"
+IMAGE_DISPLAY_FORMAT = os.getenv("IMAGE_DISPLAY_FORMAT", "WEBP")
+IMAGE_DISPLAY_SIZE = int(os.getenv("IMAGE_DISPLAY_SIZE", "768"))
+IMAGE_DISPLAY_QUALITY = int(os.getenv("IMAGE_DISPLAY_QUALITY", "80"))
+IMAGE_THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "256"))
+
+# Render tiers (square size in pixels, steps). With IMAGE_PREVIEW, background
+# jobs render the preview tier first at the same seed, then the full tier
+# right away ("auto") or only when the user asks for it ("manual")
+IMAGE_FULL_SIZE = int(os.getenv("IMAGE_FULL_SIZE", "1024"))
+IMAGE_FULL_STEPS = int(os.getenv("IMAGE_FULL_STEPS", "30"))
+IMAGE_PREVIEW = os.getenv("IMAGE_PREVIEW", "true").lower() == "true"
+IMAGE_PREVIEW_SIZE = int(os.getenv("IMAGE_PREVIEW_SIZE", "512"))
+IMAGE_PREVIEW_STEPS = int(os.getenv("IMAGE_PREVIEW_STEPS", "8"))
+IMAGE_REFINE = os.getenv("IMAGE_REFINE", "auto").lower()
+
+# Background image jobs: concurrent renders, optional SQLite file to survive
+# restarts, finished jobs kept in memory, and how often the UI polls
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+IMAGE_JOB_DB = os.getenv("IMAGE_JOB_DB", "")
+IMAGE_JOB_RETAIN = int(os.getenv("IMAGE_JOB_RETAIN", "256"))
+IMAGE_JOB_POLL_INTERVAL = float(os.getenv("IMAGE_JOB_POLL_INTERVAL", "1.5"))
+
+# Image bytes behind session and job handles: recent ones in memory, older
+# ones spilled to files (a private temp dir unless RESULT_SPILL_DIR is set)
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(128 * 1024 * 1024)))
+RESULT_SPILL_DIR = os.getenv("RESULT_SPILL_DIR", "")
+RESULT_SPILL_MAX_BYTES = int(os.getenv("RESULT_SPILL_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Variant mode: one image prompt rendered across several styles/seeds/models
+VARIANT_CONCURRENCY = int(os.getenv("VARIANT_CONCURRENCY", "4"))
+VARIANT_MAX = int(os.getenv("VARIANT_MAX", "8"))
+
+# Agent-level cache matching near-duplicate queries (per style); its byte
+# limit covers the cached text, the images are held in the result store
+QUERY_CACHE = os.getenv("QUERY_CACHE", "true").lower() == "true"
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_THRESHOLD = float(os.getenv("QUERY_CACHE_THRESHOLD", "0.8"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", str(24 * 3600)))
+
+# Prebuilt answers for top DAOs (python -m app.build_bundle); empty disables
+WARM_BUNDLE_DIR = os.getenv("WARM_BUNDLE_DIR", os.path.join(CACHE_DIR, "warm_bundle"))
+
+# Tavily results: fresh for SEARCH_CACHE_TTL, then served stale while refreshing
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_MAX_STALE = float(os.getenv("SEARCH_CACHE_MAX_STALE", str(7 * 24 * 3600)))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+
+# Token budget for search content passed to LLM prompts (0 passes it whole)
+SEARCH_CONTEXT_TOKENS = int(os.getenv("SEARCH_CONTEXT_TOKENS", "300"))
+
+# Adaptive search: Tavily's fast "basic" depth first, escalating to "advanced"
+# when the content is shorter than SEARCH_MIN_CHARS or covers less than
+# SEARCH_MIN_RELEVANCE of the query terms. SEARCH_FANOUT also searches the
+# name alone and with "governance", merging results by URL
+SEARCH_ADAPTIVE = os.getenv("SEARCH_ADAPTIVE", "true").lower() == "true"
+SEARCH_FANOUT = os.getenv("SEARCH_FANOUT", "false").lower() == "true"
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "2"))
+SEARCH_MIN_CHARS = int(os.getenv("SEARCH_MIN_CHARS", "600"))
+SEARCH_MIN_RELEVANCE = float(os.getenv("SEARCH_MIN_RELEVANCE", "0.5"))
+
+# Upstream latency budgets (seconds), retries and hedging
+UPSTREAM_TIMEOUT_LLM = float(os.getenv("UPSTREAM_TIMEOUT_LLM", "30"))
+UPSTREAM_TIMEOUT_IMAGE = float(os.getenv("UPSTREAM_TIMEOUT_IMAGE", "90"))
+UPSTREAM_TIMEOUT_SEARCH = float(os.getenv("UPSTREAM_TIMEOUT_SEARCH", "20"))
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+# Comma separated stages that may send a duplicate request past their p95
+UPSTREAM_HEDGE_STAGES = [s.strip() for s in os.getenv("UPSTREAM_HEDGE_STAGES", "classify").split(",") if s.strip()]
+
+# Model routing overrides as JSON, e.g. LLM_MODEL_ROUTES='{"general": {"models": ["llama-3.3-70b"], "max_tokens": 300}}'
+# and IMAGE_MODEL_ROUTE='{"models": ["flux-dev", "fluently-xl"], "p95_budget": 30}'
+LLM_MODEL_ROUTES = os.getenv("LLM_MODEL_ROUTES", "")
+IMAGE_MODEL_ROUTE = os.getenv("IMAGE_MODEL_ROUTE", "")
+# Seconds of latency history per model, and samples needed before routing on it
+MODEL_ROUTING_WINDOW = float(os.getenv("MODEL_ROUTING_WINDOW", "300"))
+MODEL_ROUTING_MIN_SAMPLES = int(os.getenv("MODEL_ROUTING_MIN_SAMPLES", "10"))
+
+# Shared token-bucket limits per upstream (requests/second, burst); 0 disables
+VENICE_LLM_RATE = float(os.getenv("VENICE_LLM_RATE", "5"))
+VENICE_LLM_BURST = float(os.getenv("VENICE_LLM_BURST", "10"))
+VENICE_IMAGE_RATE = float(os.getenv("VENICE_IMAGE_RATE", "1"))
+VENICE_IMAGE_BURST = float(os.getenv("VENICE_IMAGE_BURST", "3"))
+TAVILY_RATE = float(os.getenv("TAVILY_RATE", "2"))
+TAVILY_BURST = float(os.getenv("TAVILY_BURST", "5"))
+
+# Local rule/name-index classifier tried before the LLM
+LOCAL_CLASSIFIER = os.getenv("LOCAL_CLASSIFIER", "true").lower() == "true"
+KNOWN_DAOS_PATH = os.getenv(
+    "KNOWN_DAOS_PATH", os.path.join(os.path.dirname(__file__), "data", "known_daos.json")
+)
+KNOWN_DAOS_RELOAD_INTERVAL = float(os.getenv("KNOWN_DAOS_RELOAD_INTERVAL", "30"))
+
+# Start search and general answer alongside classification
+AGENT_SPECULATIVE = os.getenv("AGENT_SPECULATIVE", "false").lower() == "true"
+
+# Headless HTTP API (python -m app.api)
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "2"))
+
+# Prometheus /metrics endpoint (0 disables it)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
 # Validation
 if not TAVILY_API_KEY or not VENICE_API_KEY:
     print("Warning: Missing API keys in environment variables")
@@ -1,66 +1,315 @@
-from typing import Dict
+import time
+import asyncio
+from typing import AsyncIterator, Dict, List
+from app.config import AGENT_SPECULATIVE, IMAGE_PREVIEW, IMAGE_REFINE, IMAGE_RENDITIONS, VARIANT_CONCURRENCY, VARIANT_MAX
+from app.utils.image_renditions import make_renditions
 from .search_service import SearchService
-from .image_service import ImageService
+from .image_service import DEFAULT_SEED, FULL, PREVIEW, ImageService
 from .llm_service import VeniceLLM
+from .image_jobs import ImageJobQueue
+from .query_cache import QueryCache, get_query_cache
+from .warm_bundle import WarmBundle, get_warm_bundle
+from .resilience import UpstreamError
+from .metrics import log_event, span, start_trace
+
+def _error_message(error: Exception) -> str:
+    """User-facing message for a failed query"""
+    if isinstance(error, UpstreamError):
+        return f"Sorry, the {error.stage} service is not responding right now. Please try again shortly."
+    return "Sorry, I encountered an error processing your request. Please try again."
+
+def _prompt_context(search_results: Dict) -> str:
+    """Compacted search content for LLM prompts; the full summary is for display"""
+    return search_results.get("context") or search_results["summary"]
+
+def _image_tiers() -> List[str]:
+    """Tiers a background job renders: the preview first when enabled, then
+    the full render unless it is left for the user to request
+    """
+    if not IMAGE_PREVIEW:
+        return [FULL]
+    return [PREVIEW] if IMAGE_REFINE == "manual" else [PREVIEW, FULL]
+
+def _discard(task: asyncio.Task):
+    """Cancel a speculative task and swallow whatever it ends with"""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
 class DAOAgent:
     """Agent for handling DAO-related queries and generating visualizations"""
 
-    def __init__(self, search_service: SearchService, image_service: ImageService):
+    def __init__(self, search_service: SearchService, image_service: ImageService, speculative: bool = AGENT_SPECULATIVE, llm: VeniceLLM = None, jobs: ImageJobQueue = None, query_cache: QueryCache = None, bundle: WarmBundle = None):
         self.search_service = search_service
         self.image_service = image_service
-        self.llm = VeniceLLM()
+        self.llm = llm or VeniceLLM()
         self.image_style = ""
+        self.speculative = speculative
+        self.jobs = jobs
+        self.query_cache = query_cache or get_query_cache()
+        self.bundle = bundle or get_warm_bundle()
+        self._image_services = {}
+
+    async def _timed(self, stage: str, timings: Dict, awaitable):
+        """Await a stage inside a trace span and record its duration in seconds"""
+        start = time.perf_counter()
+        async with span(stage):
+            result = await awaitable
+        timings[stage] = round(time.perf_counter() - start, 3)
+        return result
+
+    async def _search(self, dao_name: str, dao_info: str) -> Dict:
+        # Tavily's client is synchronous; keep it off the event loop
+        return await asyncio.to_thread(
+            self.search_service.search_dao,
+            dao_name=dao_name,
+            dao_info=dao_info
+        )
+
+    async def _renditions(self, image: bytes, timings: Dict):
+        """Browser display/thumbnail renditions, or None when disabled or no image"""
+        if not IMAGE_RENDITIONS or not image:
+            return None
+        return await self._timed("renditions", timings, asyncio.to_thread(make_renditions, image))
+
+    async def _write_image_prompt(self, dao_name: str, dao_query: str, summary: str, style: str, timings: Dict) -> str:
+        image_idea = await self._timed("image_idea", timings, self.llm.generate_image_idea(
+            dao_name=dao_name,
+            dao_query=dao_query,
+            dao_summary=summary,
+            style=style
+        ))
+        return await self._timed("image_prompt", timings, self.llm.generate_image_prompt(image_idea))
+
+    async def _visualize(self, dao_name: str, dao_query: str, summary: str, style: str, timings: Dict) -> Dict:
+        """Image idea, prompt, render and renditions for an answered query"""
+        image_prompt = await self._write_image_prompt(dao_name, dao_query, summary, style, timings)
+        image = await self._timed("image", timings, self.image_service.generate_image(image_prompt))
+        renditions = await self._renditions(image, timings)
+        return {"image_prompt": image_prompt, "image": image, "image_renditions": renditions}
+
+    def _image_service_for(self, model: str) -> ImageService:
+        """The agent's image service, or one for another Venice image model"""
+        if not model or model == self.image_service.model_name:
+            return self.image_service
+        if model not in self._image_services:
+            self._image_services[model] = ImageService(model)
+        return self._image_services[model]
+
+    async def generate_variants(self, image_prompt: str, variants: List[Dict], style: str) -> AsyncIterator[Dict]:
+        """Render one prompt for each variant, yielding results as they finish.
 
-    async def process_query(self, query: str, style:str) -> Dict:
-        """Process user query and return appropriate response"""
+        Variants are dicts with optional "style", "seed" and "model" keys; at
+        most VARIANT_CONCURRENCY renders run at once and at most VARIANT_MAX
+        variants are rendered.
+        """
+        slots = asyncio.Semaphore(VARIANT_CONCURRENCY)
+
+        async def render(index: int, variant: Dict) -> Dict:
+            variant = {"style": style, "seed": DEFAULT_SEED, **variant}
+            service = self._image_service_for(variant.get("model"))
+            async with slots:
+                async with span("variant", index=index, **variant):
+                    image = await service.generate_image(image_prompt, variant["style"], seed=variant["seed"])
+            renditions = await self._renditions(image, {})
+            return {"index": index, "variant": variant, "image": image, "image_renditions": renditions}
+
+        tasks = [asyncio.create_task(render(i, v)) for i, v in enumerate(variants[:VARIANT_MAX])]
         try:
-            # 1. Classify the query
-            classification = self.llm.classify_query(query)
-            
-            if not classification["is_dao_query"]:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                _discard(task)
+
+    def _submit_image_job(self, query: str, classification: Dict, search_results: Dict, style: str) -> str:
+        return self.jobs.submit({
+            "dao_name": classification["dao_name"],
+            "query_keywords": classification["query_keywords"],
+            "summary": _prompt_context(search_results),
+            "style": style,
+            "tiers": _image_tiers(),
+            # Lets the finished job fill the query cache like an inline run
+            "query": query,
+            "answer": {"response": search_results["summary"], "dao_info": search_results}
+        })
+
+    async def _cached_result(self, query: str, style: str):
+        """A stored or prebuilt result for this or a near-duplicate query, with fresh timings"""
+        start = time.perf_counter()
+        # Images may be read back from the result store's spill files
+        result = await asyncio.to_thread(self.query_cache.get, query, style) if self.query_cache else None
+        if result is None and self.bundle:
+            result = self.bundle.get(query, style)
+        if result is None:
+            return None
+        result["cached"] = True
+        result["timings"] = {"query_cache": round(time.perf_counter() - start, 3)}
+        return result
+
+    async def _remember(self, query: str, style: str, result: Dict):
+        """Cache complete answers (with an image) for near-duplicate queries"""
+        if self.query_cache and result.get("success") and result.get("image"):
+            excluded = {"timings", "trace_id", "image_job", "cached", "variants"}
+            # Storing the image can spill older ones to disk
+            await asyncio.to_thread(self.query_cache.set, query, style, {k: v for k, v in result.items() if k not in excluded})
+
+    async def run_image_job(self, spec: Dict, report=None) -> Dict:
+        """Runner for background image jobs queued by process_query/stream_query.
+
+        Renders spec["tiers"] in order on one model and seed, reporting each
+        tier but the last as a partial result. A result short of the full
+        tier carries a "refine" spec that renders it from the same image
+        prompt, so a preview the user asks to refine skips the LLM stages.
+        """
+        timings = {}
+        start = time.perf_counter()
+        image_prompt = spec.get("image_prompt") or await self._write_image_prompt(
+            spec["dao_name"], spec["query_keywords"], spec["summary"], spec["style"], timings
+        )
+        tiers = spec.get("tiers") or [FULL]
+        model = self.image_service.choose_model()
+        result = {"image_prompt": image_prompt, "image": None, "image_renditions": None}
+        for tier in tiers:
+            stage = "image" if tier == FULL else f"image_{tier}"
+            image = await self._timed(stage, timings, self.image_service.generate_image(image_prompt, tier=tier, model=model))
+            if image is None:
+                # Keep an earlier tier's image rather than failing the job
+                break
+            renditions = await self._renditions(image, timings)
+            result = {"image_prompt": image_prompt, "image": image, "image_renditions": renditions, "tier": tier}
+            if tier != FULL:
+                excluded = {"trace_id", "request_class", "tiers"}
+                result["refine"] = {**{k: v for k, v in spec.items() if k not in excluded}, "image_prompt": image_prompt, "tiers": [FULL]}
+            if tier != tiers[-1] and report is not None:
+                report(dict(result))
+
+        result["timings"] = self._finish_timings(timings, start)
+        log_event("image_job", success=result["image"] is not None, tier=result.get("tier"), timings=result["timings"])
+        if spec.get("query") and spec.get("answer") and result.get("tier") == FULL:
+            await self._remember(spec["query"], spec["style"], {"success": True, "dao_info": None, **spec["answer"], **result})
+        return result
+
+    async def _classify_and_answer(self, query: str, timings: Dict):
+        """Classify, then run either the search or the general answer"""
+        classification = await self._timed("classify", timings, self.llm.classify_query(query))
+        if not classification["is_dao_query"]:
+            return classification, None
+
+        if classification["existing_dao"]:
+            search_results = await self._timed("search", timings, self._search(
+                dao_name=classification["dao_name"],
+                dao_info=classification["query_keywords"]
+            ))
+        else:
+            # Handle hypothetical/general DAO queries
+            response = await self._timed("general_answer", timings, self.llm.get_general_response(query))
+            search_results = {
+                "summary": response,
+                "urls": []
+            }
+        return classification, search_results
+
+    async def _classify_and_answer_speculatively(self, query: str, timings: Dict):
+        """Start the search and the general answer alongside classification.
+
+        The branch the classification rules out is cancelled. A search that is
+        already running in Tavily's worker thread finishes there, but its result
+        is dropped and nothing waits on it.
+        """
+        # The stage coroutines are created inside the tasks, so a task cancelled
+        # before it starts leaves no never-awaited coroutine behind
+        async def search():
+            return await self._timed("search", timings, self._search(query, None))
+
+        async def general_answer():
+            return await self._timed("general_answer", timings, self.llm.get_general_response(query))
+
+        search_task = asyncio.create_task(search())
+        general_task = asyncio.create_task(general_answer())
+        try:
+            classification = await self._timed("classify", timings, self.llm.classify_query(query))
+        except BaseException:
+            _discard(search_task)
+            _discard(general_task)
+            raise
+
+        if not classification["is_dao_query"]:
+            _discard(search_task)
+            _discard(general_task)
+            timings["cancelled"] = ["search", "general_answer"]
+            return classification, None
+
+        if classification["existing_dao"]:
+            _discard(general_task)
+            timings["cancelled"] = ["general_answer"]
+            search_results = await search_task
+        else:
+            _discard(search_task)
+            timings["cancelled"] = ["search"]
+            search_results = {
+                "summary": await general_task,
+                "urls": []
+            }
+        return classification, search_results
+
+    async def process_query(self, query: str, style:str, background_image: bool = False) -> Dict:
+        """Process user query and return appropriate response.
+
+        With background_image (and a job queue), the answer is returned as soon
+        as it is ready with an "image_job" id instead of the image.
+        """
+        trace_id = start_trace()
+        result = await self._cached_result(query, style)
+        if result is None:
+            result = await self._process_query(query, style, background_image and self.jobs is not None)
+            await self._remember(query, style, result)
+        result["trace_id"] = trace_id
+        log_event("request", success=result["success"], timings=result.get("timings"))
+        return result
+
+    async def _process_query(self, query: str, style: str, background_image: bool = False) -> Dict:
+        timings = {}
+        start = time.perf_counter()
+        try:
+            # 1. Classify the query and 2. handle DAO-specific queries
+            if self.speculative:
+                classification, search_results = await self._classify_and_answer_speculatively(query, timings)
+            else:
+                classification, search_results = await self._classify_and_answer(query, timings)
+
+            if search_results is None:
                 return {
                     "success": True,
                     "response": "I can only help with DAO-related questions. Please ask something about DAOs.",
                     "dao_info": None,
                     "image": None,
-                    "image_prompt": None
-                }
-
-            # 2. Handle DAO-specific queries
-            if classification["existing_dao"]:
-                # Search for existing DAO
-                search_results = self.search_service.search_dao(
-                    dao_name=classification["dao_name"],
-                    dao_info=classification["query_keywords"]
-                )
-            else:
-                # Handle hypothetical/general DAO queries
-                response = self.llm.get_general_response(query)
-                search_results = {
-                    "summary": response,
-                    "urls": []
+                    "image_prompt": None,
+                    "timings": self._finish_timings(timings, start)
                 }
 
             # 3. Generate visualization for existing DAOs
             if search_results["summary"]:
-                # Generate image concept
-                image_idea = self.llm.generate_image_idea(
-                    dao_name=classification["dao_name"],
-                    dao_query=classification["query_keywords"],
-                    dao_summary=search_results["summary"],
-                    style=style
-                )
-
-                image_prompt = self.llm.generate_image_prompt(image_idea)
-                image = self.image_service.generate_image(image_prompt)
+                if background_image:
+                    # Answer now; the image renders in the background
+                    return {
+                        "success": True,
+                        "response": search_results["summary"],
+                        "dao_info": search_results,
+                        "image": None,
+                        "image_prompt": None,
+                        "image_job": self._submit_image_job(query, classification, search_results, style),
+                        "timings": self._finish_timings(timings, start)
+                    }
 
+                visual = await self._visualize(
+                    classification["dao_name"], classification["query_keywords"], _prompt_context(search_results), style, timings
+                )
                 return {
                     "success": True,
                     "response": search_results["summary"],
                     "dao_info": search_results,
-                    "image": image,
-                    "image_prompt": image_prompt
+                    **visual,
+                    "timings": self._finish_timings(timings, start)
                 }
             else:
                 return {
@@ -68,14 +317,194 @@ class DAOAgent:
                     "response": "Could not find detailed information about this DAO.",
                     "dao_info": None,
                     "image": None,
-                    "image_prompt": None
+                    "image_prompt": None,
+                    "timings": self._finish_timings(timings, start)
                 }
 
         except Exception as e:
             print(f"Error processing query: {str(e)}")
             return {
                 "success": False,
-                "error": "Sorry, I encountered an error processing your request. Please try again.",
+                "error": _error_message(e),
                 "dao_info": None,
-                "image": None
-            }
\ No newline at end of file
+                "image": None,
+                "timings": self._finish_timings(timings, start)
+            }
+
+    async def stream_query(self, query: str, style: str, background_image: bool = False, variants: List[Dict] = None) -> AsyncIterator[Dict]:
+        """Process a query, yielding UI events as soon as each piece is ready.
+
+        Events are dicts with a "type" key:
+        - "summary": {"text"} chunk of the answer text, appended in order
+        - "urls": {"urls"} source links for an existing DAO
+        - "message": {"text"} final text when no visualization will follow
+        - "image_prompt": {"image_prompt"} prompt sent to image generation
+        - "image": {"image", "image_renditions"} original bytes (None on failure)
+          plus display/thumbnail renditions when enabled
+        - "image_job": {"job_id"} instead of the two above when background_image
+          is set and a job queue is configured
+        - "variant": {"index", "variant", "image", "image_renditions"} per
+          rendered variant, in completion order, instead of "image" when
+          variants are given
+        - "done": {"result"} same dict process_query would have returned
+        """
+        trace_id = start_trace()
+        cached = None if variants else await self._cached_result(query, style)
+        if cached is not None:
+            events = self._replay(cached)
+        else:
+            events = self._stream_query(query, style, background_image and self.jobs is not None, variants)
+        async for event in events:
+            if event["type"] == "done":
+                if cached is None:
+                    await self._remember(query, style, event["result"])
+                event["result"]["trace_id"] = trace_id
+                log_event("request", success=event["result"]["success"], timings=event["result"].get("timings"))
+            yield event
+
+    async def _replay(self, result: Dict) -> AsyncIterator[Dict]:
+        """Stream events for a cached result"""
+        yield {"type": "summary", "text": result["response"]}
+        urls = (result.get("dao_info") or {}).get("urls")
+        if urls:
+            yield {"type": "urls", "urls": urls}
+        yield {"type": "image_prompt", "image_prompt": result.get("image_prompt")}
+        yield {"type": "image", "image": result.get("image"), "image_renditions": result.get("image_renditions")}
+        yield {"type": "done", "result": result}
+
+    async def _stream_query(self, query: str, style: str, background_image: bool = False, variants: List[Dict] = None) -> AsyncIterator[Dict]:
+        timings = {}
+        start = time.perf_counter()
+        try:
+            if self.speculative:
+                # Search and the general answer start alongside classification; the
+                # answer then arrives whole instead of token by token
+                classification, search_results = await self._classify_and_answer_speculatively(query, timings)
+            else:
+                classification = await self._timed("classify", timings, self.llm.classify_query(query))
+            if not classification["is_dao_query"]:
+                message = "I can only help with DAO-related questions. Please ask something about DAOs."
+                yield {"type": "message", "text": message}
+                yield {"type": "done", "result": {
+                    "success": True,
+                    "response": message,
+                    "dao_info": None,
+                    "image": None,
+                    "image_prompt": None,
+                    "timings": self._finish_timings(timings, start)
+                }}
+                return
+
+            if self.speculative:
+                if search_results["summary"]:
+                    yield {"type": "summary", "text": search_results["summary"]}
+                    if classification["existing_dao"]:
+                        yield {"type": "urls", "urls": search_results["urls"]}
+            elif classification["existing_dao"]:
+                search_results = await self._timed("search", timings, self._search(
+                    dao_name=classification["dao_name"],
+                    dao_info=classification["query_keywords"]
+                ))
+                if search_results["summary"]:
+                    yield {"type": "summary", "text": search_results["summary"]}
+                    yield {"type": "urls", "urls": search_results["urls"]}
+            else:
+                stage_start = time.perf_counter()
+                chunks = []
+                async with span("general_answer", streamed=True):
+                    async for text in self.llm.stream_general_response(query):
+                        if not chunks:
+                            timings["first_token"] = round(time.perf_counter() - start, 3)
+                        chunks.append(text)
+                        yield {"type": "summary", "text": text}
+                timings["general_answer"] = round(time.perf_counter() - stage_start, 3)
+                search_results = {
+                    "summary": "".join(chunks),
+                    "urls": []
+                }
+
+            if not search_results["summary"]:
+                message = "Could not find detailed information about this DAO."
+                yield {"type": "message", "text": message}
+                yield {"type": "done", "result": {
+                    "success": True,
+                    "response": message,
+                    "dao_info": None,
+                    "image": None,
+                    "image_prompt": None,
+                    "timings": self._finish_timings(timings, start)
+                }}
+                return
+
+            if background_image and not variants:
+                job_id = self._submit_image_job(query, classification, search_results, style)
+                yield {"type": "image_job", "job_id": job_id}
+                yield {"type": "done", "result": {
+                    "success": True,
+                    "response": search_results["summary"],
+                    "dao_info": search_results,
+                    "image": None,
+                    "image_prompt": None,
+                    "image_job": job_id,
+                    "timings": self._finish_timings(timings, start)
+                }}
+                return
+
+            image_idea = await self._timed("image_idea", timings, self.llm.generate_image_idea(
+                dao_name=classification["dao_name"],
+                dao_query=classification["query_keywords"],
+                dao_summary=_prompt_context(search_results),
+                style=style
+            ))
+            image_prompt = await self._timed("image_prompt", timings, self.llm.generate_image_prompt(image_idea))
+            yield {"type": "image_prompt", "image_prompt": image_prompt}
+
+            if variants:
+                # The text stages ran once; only the renders fan out
+                rendered = []
+                stage_start = time.perf_counter()
+                async for item in self.generate_variants(image_prompt, variants, style):
+                    rendered.append(item)
+                    yield {"type": "variant", **item}
+                timings["variants"] = round(time.perf_counter() - stage_start, 3)
+                yield {"type": "done", "result": {
+                    "success": True,
+                    "response": search_results["summary"],
+                    "dao_info": search_results,
+                    "image": None,
+                    "image_prompt": image_prompt,
+                    "variants": sorted(rendered, key=lambda item: item["index"]),
+                    "timings": self._finish_timings(timings, start)
+                }}
+                return
+
+            image = await self._timed("image", timings, self.image_service.generate_image(image_prompt))
+            renditions = await self._renditions(image, timings)
+            yield {"type": "image", "image": image, "image_renditions": renditions}
+            yield {"type": "done", "result": {
+                "success": True,
+                "response": search_results["summary"],
+                "dao_info": search_results,
+                "image": image,
+                "image_renditions": renditions,
+                "image_prompt": image_prompt,
+                "timings": self._finish_timings(timings, start)
+            }}
+
+        except Exception as e:
+            print(f"Error processing query: {str(e)}")
+            yield {"type": "done", "result": {
+                "success": False,
+                "error": _error_message(e),
+                "dao_info": None,
+                "image": None,
+                "timings": self._finish_timings(timings, start)
+            }}
+
+    def _finish_timings(self, timings: Dict, start: float) -> Dict:
+        """Add the total and the time saved versus running the stages back to back"""
+        timings["total"] = round(time.perf_counter() - start, 3)
+        skipped = {"total", "cancelled", "first_token", *timings.get("cancelled", [])}
+        stage_sum = sum(v for k, v in timings.items() if k not in skipped)
+        timings["overlap_saved"] = round(max(stage_sum - timings["total"], 0.0), 3)
+        return timings
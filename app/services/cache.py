@@ -0,0 +1,245 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from app.config import LLM_CACHE_SIZE, LLM_CACHE_PATH
+from app.services.metrics import CACHE_EVENTS
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Per-stage cache behaviour: entry lifetime and whether to skip the cache"""
+    ttl: float
+    bypass: bool = False
+
+
+def make_key(*parts: str) -> str:
+    """Stable cache key for an ordered set of string parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Size-bounded in-process LRU of (expires_at, value) entries"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """On-disk text cache with per-entry expiry"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return (value, expires_at) for a live entry, else None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            return row
+
+    def set(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+
+class ResponseCache:
+    """Two-tier (memory LRU, then SQLite) cache for LLM responses.
+
+    Counters are tracked per stage so classification and creative generation
+    hit rates can be read separately from stats().
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, path: str = LLM_CACHE_PATH):
+        self.memory = LRUCache(max_entries)
+        self.disk = SQLiteCache(path) if path else None
+        self._counters = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0})
+        self._lock = threading.Lock()
+
+    def _count(self, stage: str, name: str):
+        with self._lock:
+            self._counters[stage][name] += 1
+        CACHE_EVENTS.inc(cache="llm", stage=stage, outcome=name)
+
+    def get(self, key: str, stage: str = "default"):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(stage, "memory_hits")
+            return value
+
+        row = self.disk.get(key) if self.disk else None
+        if row is not None:
+            value, expires_at = row
+            self.memory.set(key, value, expires_at)
+            self._count(stage, "disk_hits")
+            return value
+
+        self._count(stage, "misses")
+        return None
+
+    def set(self, key: str, value: str, ttl: float, stage: str = "default"):
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.disk:
+            self.disk.set(key, value, expires_at)
+        self._count(stage, "writes")
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk:
+            self.disk.delete(key)
+
+    def stats(self) -> dict:
+        """Hit/miss counters per stage plus the current memory tier size"""
+        with self._lock:
+            stages = {stage: dict(counts) for stage, counts in self._counters.items()}
+        return {"memory_entries": len(self.memory), "stages": stages}
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache shared by every VeniceLLM instance"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+class StaleWhileRevalidateCache:
+    """Bounded TTL cache that serves stale entries while refreshing them.
+
+    Entries younger than ttl are returned as-is. Older entries, up to
+    max_stale, are returned immediately and a background refresh is
+    scheduled; anything older is fetched synchronously.
+    """
+
+    def __init__(self, ttl: float, max_stale: float, max_entries: int, executor: ThreadPoolExecutor = None, name: str = "swr"):
+        self.name = name
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="swr-refresh")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, key, fetch):
+        try:
+            self._store(key, fetch())
+        except Exception as e:
+            print(f"Background refresh failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, calling fetch() when it is missing or too old"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.time() - entry[0]
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_EVENTS.inc(cache=self.name, stage=self.name, outcome="hit")
+                    return entry[1]
+                if age < self.ttl + self.max_stale:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    CACHE_EVENTS.inc(cache=self.name, stage=self.name, outcome="stale")
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._executor.submit(self._refresh, key, fetch)
+                    return entry[1]
+            self.misses += 1
+        CACHE_EVENTS.inc(cache=self.name, stage=self.name, outcome="miss")
+
+        value = fetch()
+        self._store(key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshing": len(self._refreshing)
+            }
@@ -0,0 +1,202 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+
+from app.config import LOCAL_CLASSIFIER, KNOWN_DAOS_PATH, KNOWN_DAOS_RELOAD_INTERVAL
+
+DAO_TERMS = {
+    "dao", "daos", "decentralized autonomous organization", "decentralized autonomous organizations",
+    "decentralised autonomous organisation", "decentralised autonomous organisations"
+}
+# Crypto vocabulary that hints at a DAO question the rules can't resolve alone
+CRYPTO_TERMS = {
+    "governance", "token", "tokens", "blockchain", "crypto", "defi", "web3", "protocol",
+    "treasury", "proposal", "proposals", "voting", "multisig", "onchain", "on chain", "nft",
+    "nfts", "ethereum", "smart contract", "staking", "dapp", "airdrop"
+}
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "at", "by", "with", "about",
+    "is", "are", "was", "be", "it", "its", "this", "that", "me", "my", "i", "you", "your", "we",
+    "tell", "show", "give", "explain", "describe", "what", "whats", "how", "why", "who", "which",
+    "can", "could", "would", "should", "do", "does", "did", "please", "info", "information",
+    "some", "any", "more", "s"
+}
+# Trailing " DAO" dropped to index an entry's bare name, e.g. "Gnosis DAO" -> "gnosis"
+DAO_SUFFIX = re.compile(r"\s+dao$", re.IGNORECASE)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, keep alphanumerics, and pad with spaces for whole-word matching"""
+    return " " + " ".join(re.sub(r"[^0-9a-z]+", " ", (text or "").lower()).split()) + " "
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every pattern occurrence in one pass over the text"""
+
+    def __init__(self, patterns: dict):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, value in patterns.items():
+            self._insert(pattern, value)
+        self._build()
+
+    def _insert(self, pattern: str, value):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._out[state].append((len(pattern), value))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def search(self, text: str):
+        """Yield (start, end, value) for every match"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._out[state]:
+                yield index + 1 - length, index + 1, value
+
+
+class LocalClassifier:
+    """Microsecond query classifier backed by an index of known DAO names.
+
+    Returns the same dict shape as VeniceLLM.classify_query when the rules
+    are confident a query is about a DAO, or None so the caller can fall
+    back to the LLM; it never rejects a query on its own. Aliases an entry
+    lists as "ambiguous" (everyday words like "avalanche" or "safe") only
+    count when the query also has DAO or crypto vocabulary. The name index
+    is reloaded when its data file changes on disk.
+    """
+
+    def __init__(self, path: str = KNOWN_DAOS_PATH, reload_interval: float = KNOWN_DAOS_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._names = AhoCorasick({})
+        self._terms = AhoCorasick({
+            **{f" {term} ": "dao" for term in DAO_TERMS},
+            **{f" {term} ": "crypto" for term in CRYPTO_TERMS}
+        })
+        self.local_hits = 0
+        self.fallbacks = 0
+        self.reload()
+
+    def reload(self):
+        """Rebuild the name index from the data file"""
+        with open(self.path, encoding="utf-8") as f:
+            entries = json.load(f)["daos"]
+        patterns = {}
+        for entry in entries:
+            ambiguous = {normalize(alias) for alias in entry.get("ambiguous", [])}
+            bare_name = DAO_SUFFIX.sub("", entry["name"])
+            for alias in [entry["name"], bare_name, *entry.get("aliases", []), *entry.get("ambiguous", [])]:
+                key = normalize(alias)
+                if key.strip():
+                    patterns[key] = (entry["name"], key in ambiguous)
+        names = AhoCorasick(patterns)
+        with self._lock:
+            self._names = names
+            self._mtime = os.path.getmtime(self.path)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            if os.path.getmtime(self.path) != self._mtime:
+                self.reload()
+        except (OSError, ValueError) as e:
+            print(f"Known DAO index reload failed: {str(e)}")
+
+    def classify(self, query: str):
+        """Classification dict when confident, otherwise None"""
+        self._maybe_reload()
+        text = normalize(query)
+        words = text.split()
+
+        kinds = {value for _, _, value in self._terms.search(text)}
+
+        # Longest, then leftmost, known-name match wins; everyday-word aliases need DAO context
+        matches = sorted(
+            ((start, end, name) for start, end, (name, ambiguous) in self._names.search(text) if kinds or not ambiguous),
+            key=lambda m: (m[0] - m[1], m[0])
+        )
+        if matches:
+            start, end, name = matches[0]
+            rest = (text[:start] + " " + text[end:]).split()
+            return self._hit(name, rest, existing=True)
+
+        # "FooDAO" style names we don't know need the LLM
+        if any(word.endswith("dao") and word not in ("dao", "daos") for word in words):
+            return self._miss()
+
+        if "dao" in kinds and not self._proper_nouns(query):
+            return self._hit(None, words, existing=False)
+
+        # Not clearly about a DAO; only the LLM may say it isn't one
+        return self._miss()
+
+    def _proper_nouns(self, query: str) -> list:
+        """Capitalized words past the first that aren't DAO vocabulary"""
+        tokens = re.findall(r"[A-Za-z][\w'-]*", query or "")[1:]
+        return [
+            token for token in tokens
+            if token[0].isupper() and token.lower() not in STOPWORDS and token.lower() not in DAO_TERMS
+        ]
+
+    def _hit(self, dao_name, words, existing: bool) -> dict:
+        self.local_hits += 1
+        keywords = [word for word in words if word not in STOPWORDS and word not in DAO_TERMS]
+        return {
+            "dao_name": dao_name,
+            "query_keywords": ", ".join(keywords) or None,
+            "is_dao_query": True,
+            "existing_dao": existing
+        }
+
+    def _miss(self):
+        self.fallbacks += 1
+        return None
+
+    def stats(self) -> dict:
+        return {"local_hits": self.local_hits, "fallbacks": self.fallbacks}
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_local_classifier():
+    """Process-wide local classifier, or None when LOCAL_CLASSIFIER is off"""
+    global _classifier
+    if not LOCAL_CLASSIFIER:
+        return None
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = LocalClassifier()
+        return _classifier
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+import weakref
+
+import httpx
+from app.config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_TIMEOUT
+)
+
+# One pooled client per event loop; httpx connections cannot cross loops
+_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the keep-alive HTTP/2 client bound to the running event loop"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=True,
+                timeout=HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+                )
+            )
+            _clients[loop] = client
+        return client
+
+
+async def close_http_client():
+    """Close the client bound to the running event loop, if any"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
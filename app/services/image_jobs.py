@@ -0,0 +1,246 @@
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from app.config import IMAGE_JOB_WORKERS, IMAGE_JOB_DB, IMAGE_JOB_RETAIN
+from app.services.image_store import ImageStore, get_image_store
+from app.services.metrics import trace_id_var
+from app.services.result_store import ResultStore, get_result_store
+from app.services.scheduler import INTERACTIVE, request_class
+from app.utils.async_runner import get_event_loop
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class ImageJob:
+    id: str
+    spec: dict
+    status: str = PENDING
+    result: dict = None
+    error: str = None
+    created: float = field(default_factory=time.time)
+    skipped: bool = False
+    task: asyncio.Task = field(default=None, repr=False)
+    future: Future = field(default_factory=Future, repr=False)
+
+    def view(self) -> dict:
+        return {"id": self.id, "status": self.status, "error": self.error, **(self.result or {})}
+
+
+class ImageJobQueue:
+    """Runs image generation jobs in the background on the shared event loop.
+
+    runner is an async callable taking a job spec (a JSON-able dict) and a
+    report callback, and returning {"image_prompt", "image",
+    "image_renditions", ...}. The runner may report a partial result (a
+    preview) while it works; status() shows it until the job finishes, and a
+    skipped job ends with it. At most
+    `workers` jobs run at once; the rest wait in submission order. With a
+    db_path, jobs are also recorded in SQLite and their images written to the
+    image store, so unfinished jobs are picked up again after a restart and
+    finished ones can still be looked up. Finished results keep their image
+    bytes in the result store, so retained jobs only hold handles.
+    """
+
+    def __init__(self, runner, workers: int = IMAGE_JOB_WORKERS, db_path: str = IMAGE_JOB_DB,
+                 store: ImageStore = None, retain: int = IMAGE_JOB_RETAIN, results: ResultStore = None):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.retain = retain
+        self.store = store or get_image_store()
+        self.results = results or get_result_store()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = None
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT, spec TEXT,"
+                " result TEXT, error TEXT, created REAL, updated REAL)"
+            )
+            self._recover()
+
+    def submit(self, spec: dict) -> str:
+        """Queue a job and return its id immediately"""
+        spec = {"trace_id": trace_id_var.get(), "request_class": request_class.get(), **spec}
+        job = ImageJob(uuid.uuid4().hex, spec)
+        # Recorded as pending by _run, off the caller's (possibly event loop) thread
+        self._schedule(job)
+        return job.id
+
+    def status(self, job_id: str):
+        """Current state of a job as a dict, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return self.results.load(job.view())
+        return self._load(job_id)
+
+    def skip(self, job_id: str) -> bool:
+        """Stop a job the user has moved on from. A pending job won't start; a
+        running one is cancelled and keeps the last partial result it reported.
+        False if the job is unknown or already finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.future.done():
+                return False
+            job.skipped = True
+            task = job.task
+        if task is not None:
+            task.get_loop().call_soon_threadsafe(task.cancel)
+        return True
+
+    def _report(self, job: ImageJob, partial: dict):
+        job.result = partial
+
+    async def wait(self, job_id: str, timeout: float = None):
+        """Wait for a job started in this process to finish and return its final state"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return self.status(job_id)
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+        return self.results.load(job.view())
+
+    def _schedule(self, job: ImageJob):
+        with self._lock:
+            self._jobs[job.id] = job
+        asyncio.run_coroutine_threadsafe(self._run(job), get_event_loop())
+
+    async def _run(self, job: ImageJob):
+        await asyncio.to_thread(self._save, job)
+        if self._slots is None:
+            # Created on the loop that runs the jobs
+            self._slots = asyncio.Semaphore(self.workers)
+        async with self._slots:
+            if job.skipped:
+                job.status = SKIPPED
+                self.skipped += 1
+                await asyncio.to_thread(self._save, job)
+                job.future.set_result(job.status)
+                self._trim()
+                return
+            job.status = RUNNING
+            trace_id_var.set(job.spec.get("trace_id"))
+            request_class.set(job.spec.get("request_class", INTERACTIVE))
+            with self._lock:
+                # skip() reads task under the same lock, so it either sees the
+                # task and cancels it or has already set skipped
+                job.task = asyncio.ensure_future(self.runner(job.spec, lambda partial: self._report(job, partial)))
+                skipped = job.skipped
+            if skipped:
+                job.task.cancel()
+            try:
+                await asyncio.to_thread(self._save, job)
+                job.result = await job.task
+                job.status = DONE if job.result.get("image") else FAILED
+                if job.status == FAILED:
+                    job.error = "Image generation failed"
+            except asyncio.CancelledError:
+                if not job.skipped:
+                    raise
+                # Whatever was reported before the skip (a preview) is the result
+                job.status = DONE if (job.result or {}).get("image") else SKIPPED
+            except Exception as e:
+                print(f"Image job {job.id} failed: {str(e)}")
+                job.status = FAILED
+                job.error = str(e)
+            if job.result:
+                job.result = await asyncio.to_thread(self.results.stash, job.result)
+            if job.status == DONE:
+                self.completed += 1
+            elif job.status == SKIPPED:
+                self.skipped += 1
+            else:
+                self.failed += 1
+            await asyncio.to_thread(self._save, job)
+            job.future.set_result(job.status)
+            self._trim()
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+            for job_id in finished[:max(0, len(finished) - self.retain)]:
+                del self._jobs[job_id]
+
+    def _save(self, job: ImageJob):
+        if self._conn is None:
+            return
+        result = None
+        if job.result is not None:
+            result = json.dumps(self._persistable(self.results.load(job.result)))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, spec, result, error, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.status, json.dumps(job.spec), result, job.error, job.created, time.time())
+            )
+
+    def _persistable(self, result: dict) -> dict:
+        """Swap image bytes for image store hashes"""
+        stored = {k: v for k, v in result.items() if k not in ("image", "image_renditions")}
+        if self.store and result.get("image"):
+            stored["image"] = self.store.put_blob(result["image"])
+            renditions = result.get("image_renditions")
+            if renditions:
+                stored["image_renditions"] = {
+                    "display": self.store.put_blob(renditions["display"]),
+                    "thumbnail": self.store.put_blob(renditions["thumbnail"]),
+                    "mime": renditions["mime"]
+                }
+        return stored
+
+    def _load(self, job_id: str):
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, result, error = row
+        result = json.loads(result) if result else {}
+        if self.store and result.get("image"):
+            result["image"] = self.store.get_blob(result["image"])
+            renditions = result.get("image_renditions")
+            if renditions:
+                result["image_renditions"] = {
+                    "display": self.store.get_blob(renditions["display"]),
+                    "thumbnail": self.store.get_blob(renditions["thumbnail"]),
+                    "mime": renditions["mime"]
+                }
+        return {"id": job_id, "status": status, "error": error, **result}
+
+    def _recover(self):
+        """Requeue jobs that were pending or running when the process stopped"""
+        rows = self._conn.execute(
+            "SELECT id, spec, created FROM jobs WHERE status IN (?, ?) ORDER BY created", (PENDING, RUNNING)
+        ).fetchall()
+        for job_id, spec, created in rows:
+            self._schedule(ImageJob(job_id, json.loads(spec), created=created))
+        if rows:
+            print(f"Resuming {len(rows)} unfinished image job(s)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if not job.future.done())
+        return {"active": active, "completed": self.completed, "failed": self.failed, "skipped": self.skipped}
@@ -1,9 +1,25 @@
 import json
+import time
 import base64
+import asyncio
 from enum import Enum
 
-import requests
-from app.config import VENICE_API_KEY, PLACEHOLDER_IMAGE_URL
+from app.config import (
+    VENICE_API_KEY,
+    VENICE_API_BASE,
+    PLACEHOLDER_IMAGE_URL,
+    IMAGE_RETURN_BINARY,
+    IMAGE_FULL_SIZE,
+    IMAGE_FULL_STEPS,
+    IMAGE_PREVIEW_SIZE,
+    IMAGE_PREVIEW_STEPS
+)
+from app.services.http_client import get_http_client
+from app.services.image_store import ImageStore, get_image_store, payload_key
+from app.services.resilience import Resilience, get_resilience
+from app.services.singleflight import SingleFlight, get_single_flight
+from app.services.routing import ModelRouter, get_image_router
+from app.services.metrics import CACHE_EVENTS, PAYLOAD_BYTES
 
 
 class NegativePrompts(Enum):
@@ -102,39 +118,100 @@ class VeniceAiModelStyles(Enum):
     SILHOUETTE = "Silhouette"
     TILT_SHIFT = "Tilt-Shift"
 
+DEFAULT_SEED = 123
+
+# Render tiers: (square size, steps)
+PREVIEW = "preview"
+FULL = "full"
+IMAGE_TIERS = {
+    PREVIEW: (IMAGE_PREVIEW_SIZE, IMAGE_PREVIEW_STEPS),
+    FULL: (IMAGE_FULL_SIZE, IMAGE_FULL_STEPS),
+}
+
 class ImageService():
-    def __init__(self, model_name = VeniceAiModelsEnum.FLUENTLY_XL.value):
+    def __init__(self, model_name = None, store: ImageStore = None, resilience: Resilience = None, flight: SingleFlight = None, router: ModelRouter = None):
+        # No model name: pick one per request from the image route (fluently-xl first)
         self.model_name = model_name
-        self.api_url = "https://api.venice.ai/api/v1/image/generate"
+        self.router = router or get_image_router()
+        self.store = store or get_image_store()
+        self.resilience = resilience or get_resilience()
+        self.flight = flight or get_single_flight()
+        self.api_url = f"{VENICE_API_BASE}/image/generate"
         self.headers = {
             "Authorization": f"Bearer {VENICE_API_KEY}",
             "Content-Type": "application/json"
         }
 
-    def generate_image(self, prompt, style="3D Model"):
+    def choose_model(self) -> str:
+        """This service's model, or the one the image route picks right now"""
+        return self.model_name or self.router.select("image")
+
+    async def generate_image(self, prompt, style="3D Model", seed=DEFAULT_SEED, tier=FULL, model=None):
+        # Pass the model to render several tiers of one image on the same model
+        model = model or self.choose_model()
+        size, steps = IMAGE_TIERS[tier]
         payload = {
-            "model": f"{self.model_name}",
+            "model": f"{model}",
             "prompt": prompt,
-            "width": 1024,
-            "height": 1024,
-            "steps": 30,
+            "width": size,
+            "height": size,
+            "steps": steps,
             "hide_watermark": True,
-            "return_binary": False,
-            "seed": 123,
+            "return_binary": IMAGE_RETURN_BINARY,
+            "seed": seed,
             "cfg_scale": 14,
             "style_preset": style,
             "negative_prompt": NegativePrompts.BASIC.value,
             "safe_mode": False
         }
 
-        response = requests.request("POST", self.api_url, json=payload, headers=self.headers)
+        # Seeded renders are deterministic, so an identical payload always renders the same image
+        if self.store:
+            image = await asyncio.to_thread(self.store.get, payload)
+            CACHE_EVENTS.inc(cache="image", stage="image", outcome="miss" if image is None else "hit")
+            if image is not None:
+                return image
+
+        async def fetch():
+            # Only full renders count towards the image route's p95
+            stage = "image" if tier == FULL else f"image_{tier}"
+            start = time.perf_counter()
+            try:
+                image = await self.resilience.call(
+                    "image", lambda: self._request(payload), upstream=f"venice-image:{model}"
+                )
+            except Exception:
+                self.router.record_failure(stage, model, time.perf_counter() - start, self.resilience.policy("image").timeout)
+                raise
+            if image is not None:
+                self.router.record(stage, model, time.perf_counter() - start)
+                if self.store:
+                    await asyncio.to_thread(self.store.put, payload, image)
+            return image
+
+        try:
+            # Concurrent identical payloads share one render
+            return await self.flight.do(payload_key(payload), fetch, name="image")
+        except Exception as e:
+            print(f"Image generation failed: {str(e)}")
+            return None
 
-        if response.status_code == 200:
+    async def _request(self, payload: dict):
+        async with get_http_client().stream("POST", self.api_url, json=payload, headers=self.headers) as response:
+            # 429/5xx raise so the resilience layer can retry them
+            if response.status_code == 429 or response.status_code >= 500:
+                response.raise_for_status()
+            if response.status_code != 200:
+                return None
             try:
-                image_json = json.loads(response.text)
+                if response.headers.get("content-type", "").startswith("image/"):
+                    # Raw bytes straight into one buffer, no base64 or JSON copy
+                    chunks = [chunk async for chunk in response.aiter_bytes()]
+                    PAYLOAD_BYTES.observe(response.num_bytes_downloaded, stage="image", direction="response")
+                    return b"".join(chunks)
+                image_json = json.loads(await response.aread())
+                PAYLOAD_BYTES.observe(response.num_bytes_downloaded, stage="image", direction="response")
                 image_to_encode =  image_json['images'][0]
                 return base64.b64decode(image_to_encode, validate=True)
             except:
-                return None
-        else:
-            return None
\ No newline at end of file
+                return None
\ No newline at end of file
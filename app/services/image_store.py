@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from app.config import IMAGE_STORE_DIR, IMAGE_STORE_MAX_BYTES
+
+# Fields that only change how the image is delivered, not what is rendered
+TRANSPORT_FIELDS = {"return_binary"}
+BLOB_HASH = re.compile(r"[0-9a-f]{64}")
+
+
+def payload_key(payload: dict) -> str:
+    """Hash of the canonical JSON form of an image generation payload"""
+    canonical = {k: v for k, v in payload.items() if k not in TRANSPORT_FIELDS}
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ImageStore:
+    """Disk-backed, content-addressed store for generated images.
+
+    Payload hashes map to blobs named by the hash of their bytes, so identical
+    images produced by different payloads are stored once. When the total blob
+    size exceeds max_bytes the least recently used blobs are evicted.
+    """
+
+    def __init__(self, root: str = IMAGE_STORE_DIR, max_bytes: int = IMAGE_STORE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(root, "index.sqlite"), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, blob TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size INTEGER, last_access REAL)"
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _blob_path(self, blob_hash: str) -> str:
+        return os.path.join(self.blob_dir, blob_hash)
+
+    def get(self, payload: dict):
+        """Return stored image bytes for this payload, or None"""
+        key = payload_key(payload)
+        with self._lock:
+            row = self._conn.execute("SELECT blob FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                with open(self._blob_path(row[0]), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self._conn.execute("DELETE FROM entries WHERE blob = ?", (row[0],))
+                self._conn.execute("DELETE FROM blobs WHERE hash = ?", (row[0],))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), row[0]))
+            self.hits += 1
+            return data
+
+    def put(self, payload: dict, data: bytes) -> str:
+        """Store image bytes for this payload and return their content hash"""
+        key = payload_key(payload)
+        with self._lock:
+            blob_hash = self._write_blob(data)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, blob) VALUES (?, ?)", (key, blob_hash)
+            )
+            self._evict()
+        return blob_hash
+
+    def put_blob(self, data: bytes) -> str:
+        """Store bytes (e.g. a rendition) with no payload entry and return their content hash"""
+        with self._lock:
+            blob_hash = self._write_blob(data)
+            self._evict()
+        return blob_hash
+
+    def get_blob(self, blob_hash: str):
+        """Return the bytes stored under a content hash, or None"""
+        if not BLOB_HASH.fullmatch(blob_hash or ""):
+            return None
+        with self._lock:
+            try:
+                with open(self._blob_path(blob_hash), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), blob_hash))
+            return data
+
+    def _write_blob(self, data: bytes) -> str:
+        blob_hash = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(blob_hash)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO blobs (hash, size, last_access) VALUES (?, ?, ?)",
+            (blob_hash, len(data), time.time())
+        )
+        return blob_hash
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for blob_hash, size in self._conn.execute(
+            "SELECT hash, size FROM blobs ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE blob = ?", (blob_hash,))
+            self._conn.execute("DELETE FROM blobs WHERE hash = ?", (blob_hash,))
+            try:
+                os.remove(self._blob_path(blob_hash))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "blobs": count, "bytes": total}
+
+
+_image_store = None
+_image_store_lock = threading.Lock()
+
+
+def get_image_store():
+    """Process-wide image store, or None when IMAGE_STORE_MAX_BYTES is 0"""
+    global _image_store
+    if IMAGE_STORE_MAX_BYTES <= 0:
+        return None
+    with _image_store_lock:
+        if _image_store is None:
+            _image_store = ImageStore()
+        return _image_store
@@ -1,34 +1,187 @@
 import json
-import requests
-from app.config import VENICE_API_KEY
+import time
+import asyncio
+from typing import AsyncIterator
+from app.config import (
+    VENICE_API_KEY,
+    VENICE_API_BASE,
+    LLM_CACHE_TTL_CLASSIFY,
+    LLM_CACHE_TTL_CREATIVE,
+    LLM_CACHE_BYPASS
+)
+from app.services.classifier import LocalClassifier, get_local_classifier
+from app.services.cache import CachePolicy, ResponseCache, get_response_cache, make_key
+from app.services.http_client import get_http_client
+from app.services.resilience import Resilience, UpstreamError, get_resilience
+from app.services.singleflight import SingleFlight, get_single_flight
+from app.services.metrics import CACHE_EVENTS, LLM_TOKENS, PAYLOAD_BYTES
+from app.services.routing import ModelRouter, Route, get_llm_router
+
+# Cache policy per stage; classification is stable, creative output less so
+CACHE_POLICIES = {
+    "classify": CachePolicy(ttl=LLM_CACHE_TTL_CLASSIFY),
+    "general": CachePolicy(ttl=LLM_CACHE_TTL_CREATIVE),
+    "image_idea": CachePolicy(ttl=LLM_CACHE_TTL_CREATIVE),
+    "image_prompt": CachePolicy(ttl=LLM_CACHE_TTL_CREATIVE),
+}
+for _stage in LLM_CACHE_BYPASS:
+    CACHE_POLICIES[_stage] = CachePolicy(ttl=0, bypass=True)
 
 class VeniceLLM:
     """Venice AI service for LLM interactions"""
     
-    def __init__(self):
-        self.api_url = "https://api.venice.ai/api/v1/chat/completions"
-        self.model = "dolphin-2.9.2-qwen2-72b"
+    def __init__(self, cache: ResponseCache = None, resilience: Resilience = None, flight: SingleFlight = None, classifier: LocalClassifier = None, router: ModelRouter = None):
+        self.api_url = f"{VENICE_API_BASE}/chat/completions"
         self.headers = {
             "Authorization": f"Bearer {VENICE_API_KEY}",
             "Content-Type": "application/json"
         }
+        self.cache = cache or get_response_cache()
+        self.resilience = resilience or get_resilience()
+        self.flight = flight or get_single_flight()
+        self.classifier = classifier or get_local_classifier()
+        self.router = router or get_llm_router()
+
+    def _cache_key(self, stage: str, prompt: str) -> str:
+        # Keyed by the stage's preferred model so a fallback answer is still reused
+        return make_key(self.router.route(stage).models[0], prompt)
+
+    def _payload(self, prompt: str, model: str, route: Route, stream: bool = False) -> dict:
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        if route.max_tokens is not None:
+            payload["max_tokens"] = route.max_tokens
+        if route.temperature is not None:
+            payload["temperature"] = route.temperature
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def _call_api(self, prompt: str, stage: str = "default") -> str:
+        """Make API call to Venice, served from the response cache when possible"""
+        policy = CACHE_POLICIES.get(stage)
+        key = self._cache_key(stage, prompt)
+        use_cache = policy is not None and not policy.bypass
+        if use_cache:
+            cached = self.cache.get(key, stage)
+            if cached is not None:
+                return cached
 
-    def _call_api(self, prompt: str) -> str:
+        async def fetch():
+            model = self.router.select(stage)
+            payload = self._payload(prompt, model, self.router.route(stage))
+            start = time.perf_counter()
+            try:
+                content = await self.resilience.call(
+                    stage, lambda: self._request(payload, stage), upstream=f"venice:{model}"
+                )
+            except Exception:
+                self.router.record_failure(stage, model, time.perf_counter() - start, self.resilience.policy(stage).timeout)
+                raise
+            self.router.record(stage, model, time.perf_counter() - start)
+            if use_cache:
+                self.cache.set(key, content, policy.ttl, stage)
+            return content
+
+        # Identical prompts already in flight share one upstream request
+        return await self.flight.do(key, fetch, name=stage)
+
+    async def _request(self, payload: dict, stage: str = "default") -> str:
         """Make API call to Venice"""
         try:
-            payload = {
-                "model": self.model,
-                "messages": [{"role": "user", "content": prompt}]
-            }
-            response = requests.post(self.api_url, json=payload, headers=self.headers)
+            response = await get_http_client().post(self.api_url, json=payload, headers=self.headers)
             response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
+            PAYLOAD_BYTES.observe(len(response.request.content), stage=stage, direction="request")
+            PAYLOAD_BYTES.observe(len(response.content), stage=stage, direction="response")
+            body = response.json()
+            usage = body.get("usage") or {}
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if usage.get(kind):
+                    LLM_TOKENS.inc(usage[kind], stage=stage, kind=kind)
+            return body["choices"][0]["message"]["content"]
         except Exception as e:
             print(f"Venice API call failed: {str(e)}")
             raise
 
-    def classify_query(self, query: str) -> dict:
+    async def _stream_api(self, prompt: str, stage: str = "default") -> AsyncIterator[str]:
+        """Stream completion text from Venice as it is generated (SSE).
+
+        A cached response is yielded as one chunk; a fully streamed response
+        is written back to the cache under the same policy as _call_api. The
+        stage timeout bounds both the wait for the first chunk and the whole
+        stream. If the stream fails or times out before any text arrives, the
+        retrying _call_api path is used instead; past that point it raises
+        UpstreamError.
+        """
+        policy = CACHE_POLICIES.get(stage)
+        use_cache = policy is not None and not policy.bypass
+        key = self._cache_key(stage, prompt)
+        if use_cache:
+            cached = self.cache.get(key, stage)
+            if cached is not None:
+                yield cached
+                return
+
+        model = self.router.select(stage)
+        payload = self._payload(prompt, model, self.router.route(stage), stream=True)
+        timeout = self.resilience.policy(stage).timeout
+        chunks = []
+        start = time.perf_counter()
+        try:
+            await self.resilience.scheduler.acquire(f"venice:{model}", stage)
+            # Like resilience.call, the rate-limit wait doesn't count against the timeout
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            client = get_http_client()
+            request = client.build_request("POST", self.api_url, json=payload, headers=self.headers)
+            response = await asyncio.wait_for(client.send(request, stream=True), timeout)
+            try:
+                response.raise_for_status()
+                lines = response.aiter_lines()
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError(f"{stage} stream exceeded {timeout}s")
+                    try:
+                        line = await asyncio.wait_for(anext(lines), remaining)
+                    except StopAsyncIteration:
+                        break
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if text:
+                        chunks.append(text)
+                        yield text
+            finally:
+                await response.aclose()
+        except Exception as e:
+            print(f"Venice streaming call failed: {e!r}")
+            self.router.record_failure(stage, model, time.perf_counter() - start, timeout)
+            if chunks:
+                # Text already went out; a second full answer can't be spliced in
+                raise UpstreamError(stage, 1, e) from e
+            yield await self._call_api(prompt, stage)
+            return
+
+        self.router.record(stage, model, time.perf_counter() - start)
+        if use_cache:
+            self.cache.set(key, "".join(chunks), policy.ttl, stage)
+
+    async def classify_query(self, query: str) -> dict:
         """Classify the query and extract relevant information"""
+        # Known DAO names and clear-cut queries are resolved without the LLM
+        if self.classifier:
+            classification = self.classifier.classify(query)
+            CACHE_EVENTS.inc(cache="classifier", stage="classify", outcome="local" if classification else "fallback")
+            if classification is not None:
+                return classification
+
         prompt = f"""Analyze this query about DAOs (Decentralized Autonomous Organizations).
         Query: {query}
         
@@ -45,12 +198,19 @@ class VeniceLLM:
         "How is the weather?" -> {{"dao_name": null, "query_keywords": null, "is_dao_query": false, "existing_dao": false}}"""
         
         try:
-            response = self._call_api(prompt)
+            response = await self._call_api(prompt, stage="classify")
             return json.loads(response)
+        except json.JSONDecodeError:
+            # Don't keep serving an unparseable classification from cache
+            self.cache.delete(self._cache_key("classify", prompt))
+            return {"dao_name": None, "dao_info": None, "is_dao_query": False, "existing_dao": False}
+        except UpstreamError:
+            # An unreachable API is not the same as "not a DAO query"
+            raise
         except:
             return {"dao_name": None, "dao_info": None, "is_dao_query": False, "existing_dao": False}
 
-    def generate_image_idea(self, dao_name: str, dao_query: str, dao_summary: str, style: str = "modern") -> str:
+    async def generate_image_idea(self, dao_name: str, dao_query: str, dao_summary: str, style: str = "modern") -> str:
         """Generate creative image idea for DAO visualization"""
         context = "\n".join(filter(None, [
             f"DAO Name: {dao_name}" if dao_name else None,
@@ -69,9 +229,9 @@ class VeniceLLM:
         
         Return only the visual concept, no explanations."""
         
-        return self._call_api(prompt)
+        return await self._call_api(prompt, stage="image_idea")
 
-    def generate_image_prompt(self, image_idea: str) -> str:
+    async def generate_image_prompt(self, image_idea: str) -> str:
         """Convert concept into optimized image generation prompt"""
         prompt = f"""Enhance this image concept for AI generation:
         {image_idea}
@@ -88,11 +248,19 @@ class VeniceLLM:
 
         Return only the enhanced prompt."""
         
-        return self._call_api(prompt)
+        return await self._call_api(prompt, stage="image_prompt")
 
-    def get_general_response(self, query: str) -> str:
+    async def get_general_response(self, query: str) -> str:
         """Provide informative response about DAOs"""
-        prompt = f"""Answer this DAO-related question clearly and concisely:
+        return await self._call_api(self._general_response_prompt(query), stage="general")
+
+    async def stream_general_response(self, query: str) -> AsyncIterator[str]:
+        """Stream the general DAO answer chunk by chunk"""
+        async for text in self._stream_api(self._general_response_prompt(query), stage="general"):
+            yield text
+
+    def _general_response_prompt(self, query: str) -> str:
+        return f"""Answer this DAO-related question clearly and concisely:
         {query}
 
         Guidelines:
@@ -101,6 +269,4 @@ class VeniceLLM:
         3. Focus on practical understanding
         4. Keep it under 150 words
         
-        Return only the answer."""
-        
-        return self._call_api(prompt)
\ No newline at end of file
+        Return only the answer."""
\ No newline at end of file
@@ -0,0 +1,204 @@
+import json
+import time
+import asyncio
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.config import METRICS_PORT
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+trace_id_var = contextvars.ContextVar("trace_id", default=None)
+logger = logging.getLogger("ava_lens.trace")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * len(self.buckets), [0, 0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            total[0] += 1
+            total[1] += value
+            self._series[key] = (counts, total)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, (count, total)) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                inf_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Minimal Prometheus text-format registry.
+
+    Collectors are callables returning extra exposition lines at scrape time,
+    used for state owned by other modules (scheduler queues, cache sizes).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_LATENCY = REGISTRY.histogram(
+    "ava_stage_latency_seconds", "Pipeline stage latency", ("stage", "outcome")
+)
+STAGE_ERRORS = REGISTRY.counter("ava_stage_errors_total", "Pipeline stage failures", ("stage",))
+PAYLOAD_BYTES = REGISTRY.histogram(
+    "ava_upstream_bytes", "Upstream request/response body sizes", ("stage", "direction"), SIZE_BUCKETS
+)
+LLM_TOKENS = REGISTRY.counter("ava_llm_tokens_total", "Venice token usage", ("stage", "kind"))
+CACHE_EVENTS = REGISTRY.counter("ava_cache_events_total", "Cache lookups by outcome", ("cache", "stage", "outcome"))
+UPSTREAM_ATTEMPTS = REGISTRY.counter(
+    "ava_upstream_attempts_total", "Upstream attempts by outcome (ok, retry, failed, hedged)", ("stage", "outcome")
+)
+
+
+def start_trace() -> str:
+    """Begin a trace for the current request and return its id"""
+    trace_id = uuid.uuid4().hex[:16]
+    trace_id_var.set(trace_id)
+    return trace_id
+
+
+def log_event(event: str, **fields):
+    """Structured JSON log line tagged with the current trace id"""
+    record = {"event": event, "trace_id": trace_id_var.get(), **fields}
+    logger.info(json.dumps(record, default=str))
+
+
+@asynccontextmanager
+async def span(stage: str, **attrs):
+    """Time a pipeline stage, record it, and log it under the current trace.
+
+    The yielded dict can be filled with extra attributes (sizes, cache hits)
+    that end up in the log line.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield attrs
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except Exception as e:
+        outcome = "error"
+        STAGE_ERRORS.inc(stage=stage)
+        attrs["error"] = repr(e)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_LATENCY.observe(duration, stage=stage, outcome=outcome)
+        log_event("span", stage=stage, outcome=outcome, duration_ms=round(duration * 1000, 1), **attrs)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT):
+    """Serve /metrics on a background thread; no-op if disabled or already running"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics server not started: {str(e)}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
@@ -0,0 +1,44 @@
+import threading
+
+from .search_service import SearchService
+from .image_service import ImageService
+from .llm_service import VeniceLLM
+from .agent_service import DAOAgent
+from .image_jobs import ImageJobQueue
+
+# Built on first use and shared by every session in the process; Streamlit
+# reruns the script on each interaction, so constructing these per rerun
+# would throw away their caches and clients every time.
+_instances = {}
+_lock = threading.RLock()
+
+
+def _get_or_create(name: str, factory):
+    with _lock:
+        if name not in _instances:
+            _instances[name] = factory()
+        return _instances[name]
+
+
+def get_search_service() -> SearchService:
+    return _get_or_create("search", SearchService)
+
+
+def get_image_service() -> ImageService:
+    return _get_or_create("image", ImageService)
+
+
+def get_llm() -> VeniceLLM:
+    return _get_or_create("llm", VeniceLLM)
+
+
+def get_image_jobs() -> ImageJobQueue:
+    # Jobs call back into the shared agent, looked up when each job runs
+    return _get_or_create("image_jobs", lambda: ImageJobQueue(lambda spec, report: get_agent().run_image_job(spec, report)))
+
+
+def get_agent() -> DAOAgent:
+    return _get_or_create(
+        "agent",
+        lambda: DAOAgent(get_search_service(), get_image_service(), llm=get_llm(), jobs=get_image_jobs())
+    )
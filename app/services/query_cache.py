@@ -0,0 +1,207 @@
+import time
+import zlib
+import random
+import threading
+from collections import OrderedDict
+
+from app.config import (
+    QUERY_CACHE,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_MAX_BYTES,
+    QUERY_CACHE_THRESHOLD,
+    QUERY_CACHE_TTL
+)
+from app.services.classifier import STOPWORDS, normalize
+from app.services.metrics import CACHE_EVENTS
+from app.services.result_store import ResultStore, get_result_store
+
+# MinHash signature length and LSH banding; 16 bands of 4 rows puts the
+# candidate threshold near a Jaccard similarity of 0.5, below the verify step
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+# Query words that don't change which answer is wanted
+QUERY_STOPWORDS = STOPWORDS | {"about", "tell", "know", "learn", "overview", "details", "summary"}
+
+
+def canonicalize(query: str) -> str:
+    """Lowercase, strip punctuation and stopwords; word order is kept"""
+    return " ".join(word for word in normalize(query).split() if word not in QUERY_STOPWORDS)
+
+
+def shingles(canonical: str) -> set:
+    """Character trigrams with spaces removed, so "maker dao" matches "makerdao" """
+    text = canonical.replace(" ", "")
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def same_terms(canonical: str, other: str) -> bool:
+    """True when every word of each query appears in the other.
+
+    Spaces are ignored, so "maker dao" still matches "makerdao", but a number
+    or qualifier found in only one query ("round 18" vs "round 19",
+    "governance v2" vs "governance") means a different question.
+    """
+    return (all(word in other.replace(" ", "") for word in canonical.split())
+            and all(word in canonical.replace(" ", "") for word in other.split()))
+
+
+def minhash(features: set) -> tuple:
+    values = [zlib.crc32(feature.encode("utf-8")) for feature in features]
+    return tuple(min((a * v + b) % _PRIME for v in values) for a, b in _HASH_PARAMS)
+
+
+def _result_size(result: dict) -> int:
+    """Bytes the entry itself holds; image bytes live in the result store"""
+    return len((result.get("response") or "").encode("utf-8")) + len((result.get("image_prompt") or "").encode("utf-8"))
+
+
+class QueryCache:
+    """Agent-level result cache that also matches near-duplicate queries.
+
+    Queries are canonicalized, turned into character-trigram sets and indexed
+    with MinHash/LSH. A lookup verifies LSH candidates with exact Jaccard
+    similarity against the threshold and requires both queries to share
+    their words, so a different number or qualifier is never a match. Entries are scoped by style and bounded
+    both by count and by bytes (LRU eviction). Images are kept as result
+    store handles, so they count against RESULT_STORE_MAX_BYTES; an entry
+    whose image has been evicted from there is dropped on lookup.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, max_bytes: int = QUERY_CACHE_MAX_BYTES,
+                 threshold: float = QUERY_CACHE_THRESHOLD, ttl: float = QUERY_CACHE_TTL,
+                 results: ResultStore = None):
+        self.results = results or get_result_store()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.threshold = threshold
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _bands(self, scope: str, signature: tuple) -> list:
+        return [(scope, band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+    def get(self, query: str, scope: str):
+        """Stored result for this or a near-duplicate query in scope, or None"""
+        canonical = canonicalize(query)
+        if not canonical:
+            return None
+        features = shingles(canonical)
+        now = time.time()
+        with self._lock:
+            key = (scope, canonical)
+            entry = self._entries.get(key)
+            near = False
+            if entry is None:
+                candidates = set()
+                for band in self._bands(scope, minhash(features)):
+                    candidates |= self._buckets.get(band, set())
+                best = 0.0
+                for candidate in candidates:
+                    if not same_terms(canonical, candidate[1]):
+                        continue
+                    other = self._entries[candidate]["features"]
+                    similarity = len(features & other) / len(features | other)
+                    if similarity >= self.threshold and similarity > best:
+                        key, best, near = candidate, similarity, True
+                entry = self._entries.get(key) if near else None
+
+            if entry is not None and now > entry["expires"]:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        result = self.results.load(entry["result"]) if entry is not None else None
+        if result is not None and entry["result"].get("image") and result["image"] is None:
+            # The image was evicted from the result store; the text alone isn't a full answer
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+            result = None
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            elif near:
+                self.near_hits += 1
+            else:
+                self.hits += 1
+        if result is None:
+            CACHE_EVENTS.inc(cache="query", stage="agent", outcome="miss")
+            return None
+        CACHE_EVENTS.inc(cache="query", stage="agent", outcome="near_hit" if near else "hit")
+        return result
+
+    def set(self, query: str, scope: str, result: dict):
+        canonical = canonicalize(query)
+        if not canonical:
+            return
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        result = self.results.stash(result)
+        features = shingles(canonical)
+        key = (scope, canonical)
+        bands = self._bands(scope, minhash(features))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                "result": result,
+                "features": features,
+                "bands": bands,
+                "size": size,
+                "expires": time.time() + self.ttl
+            }
+            self._bytes += size
+            for band in bands:
+                self._buckets.setdefault(band, set()).add(key)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+        for band in entry["bands"]:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses
+            }
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    """Process-wide query cache, or None when QUERY_CACHE is off"""
+    global _query_cache
+    if not QUERY_CACHE:
+        return None
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryCache()
+        return _query_cache
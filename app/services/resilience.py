@@ -0,0 +1,216 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+import httpx
+from app.config import (
+    UPSTREAM_TIMEOUT_LLM,
+    UPSTREAM_TIMEOUT_IMAGE,
+    UPSTREAM_TIMEOUT_SEARCH,
+    UPSTREAM_MAX_ATTEMPTS,
+    UPSTREAM_BACKOFF_BASE,
+    UPSTREAM_BACKOFF_MAX,
+    UPSTREAM_HEDGE_STAGES
+)
+from app.services.scheduler import Scheduler, get_scheduler
+from app.services.metrics import UPSTREAM_ATTEMPTS
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Latency budget and retry behaviour for one upstream stage"""
+    timeout: float
+    max_attempts: int = UPSTREAM_MAX_ATTEMPTS
+    backoff_base: float = UPSTREAM_BACKOFF_BASE
+    backoff_max: float = UPSTREAM_BACKOFF_MAX
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+STAGE_POLICIES = {
+    "classify": RetryPolicy(timeout=UPSTREAM_TIMEOUT_LLM),
+    "general": RetryPolicy(timeout=UPSTREAM_TIMEOUT_LLM),
+    "image_idea": RetryPolicy(timeout=UPSTREAM_TIMEOUT_LLM),
+    "image_prompt": RetryPolicy(timeout=UPSTREAM_TIMEOUT_LLM),
+    "image": RetryPolicy(timeout=UPSTREAM_TIMEOUT_IMAGE, max_attempts=2),
+    "search": RetryPolicy(timeout=UPSTREAM_TIMEOUT_SEARCH),
+}
+for _stage in UPSTREAM_HEDGE_STAGES:
+    if _stage in STAGE_POLICIES:
+        _policy = STAGE_POLICIES[_stage]
+        STAGE_POLICIES[_stage] = RetryPolicy(
+            timeout=_policy.timeout, max_attempts=_policy.max_attempts, hedge=True
+        )
+DEFAULT_POLICY = RetryPolicy(timeout=UPSTREAM_TIMEOUT_LLM)
+
+
+class UpstreamError(Exception):
+    """An upstream stage failed after exhausting its retries"""
+
+    def __init__(self, stage: str, attempts: int, cause: Exception):
+        super().__init__(f"{stage} failed after {attempts} attempt(s): {cause!r}")
+        self.stage = stage
+        self.attempts = attempts
+        self.cause = cause
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Timeouts, connection failures, 429 and 5xx are worth another attempt"""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Tavily goes through requests; only import it when classifying its errors
+    import requests
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one stage.
+
+    With max_age, samples older than that many seconds are dropped too.
+    """
+
+    def __init__(self, window: int = 200, max_age: float = None):
+        self._samples = deque(maxlen=window)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append((time.monotonic(), seconds))
+
+    def _prune(self):
+        if self.max_age is None:
+            return
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def quantile(self, q: float):
+        with self._lock:
+            self._prune()
+            samples = sorted(seconds for _, seconds in self._samples)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def __len__(self):
+        with self._lock:
+            self._prune()
+            return len(self._samples)
+
+
+class Resilience:
+    """Per-stage timeouts, jittered retries and optional hedged requests.
+
+    Hedging fires a duplicate request once the first has been outstanding
+    longer than the stage's observed p95 and takes whichever answers first.
+    When an upstream key is given, every attempt first waits for a token from
+    the shared scheduler; that wait does not count against the timeout, and a
+    hedge is only sent if a token is free right away.
+    """
+
+    def __init__(self, policies: dict = None, scheduler: Scheduler = None):
+        self.policies = policies or STAGE_POLICIES
+        self.scheduler = scheduler or get_scheduler()
+        self.trackers = {}
+        self._lock = threading.Lock()
+
+    def policy(self, stage: str) -> RetryPolicy:
+        return self.policies.get(stage, DEFAULT_POLICY)
+
+    def tracker(self, stage: str) -> LatencyTracker:
+        with self._lock:
+            if stage not in self.trackers:
+                self.trackers[stage] = LatencyTracker()
+            return self.trackers[stage]
+
+    async def call(self, stage: str, fn, upstream: str = None):
+        """Await fn() (a coroutine factory) under the stage's policy"""
+        policy = self.policy(stage)
+        tracker = self.tracker(stage)
+        for attempt in range(1, policy.max_attempts + 1):
+            if upstream:
+                await self.scheduler.acquire(upstream, stage)
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._attempt(stage, policy, tracker, fn, upstream), policy.timeout)
+                tracker.record(time.perf_counter() - start)
+                UPSTREAM_ATTEMPTS.inc(stage=stage, outcome="ok")
+                return result
+            except Exception as e:
+                if attempt == policy.max_attempts or not is_retryable(e):
+                    UPSTREAM_ATTEMPTS.inc(stage=stage, outcome="failed")
+                    raise UpstreamError(stage, attempt, e) from e
+                UPSTREAM_ATTEMPTS.inc(stage=stage, outcome="retry")
+                await asyncio.sleep(policy.backoff(attempt))
+
+    async def _attempt(self, stage: str, policy: RetryPolicy, tracker: LatencyTracker, fn, upstream: str = None):
+        hedge_delay = tracker.quantile(policy.hedge_quantile) if policy.hedge else None
+        if hedge_delay is None or len(tracker) < policy.hedge_min_samples:
+            return await fn()
+
+        tasks = {asyncio.create_task(fn())}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done and (not upstream or self.scheduler.try_acquire(upstream)):
+                tasks.add(asyncio.create_task(fn()))
+                UPSTREAM_ATTEMPTS.inc(stage=stage, outcome="hedged")
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def call_sync(self, stage: str, fn, upstream: str = None):
+        """Blocking variant for clients without async support (Tavily).
+
+        The timeout has to be enforced by the client itself; this only retries.
+        """
+        policy = self.policy(stage)
+        tracker = self.tracker(stage)
+        for attempt in range(1, policy.max_attempts + 1):
+            if upstream:
+                self.scheduler.acquire_sync(upstream, stage)
+            start = time.perf_counter()
+            try:
+                result = fn()
+                tracker.record(time.perf_counter() - start)
+                UPSTREAM_ATTEMPTS.inc(stage=stage, outcome="ok")
+                return result
+            except Exception as e:
+                if attempt == policy.max_attempts or not is_retryable(e):
+                    UPSTREAM_ATTEMPTS.inc(stage=stage, outcome="failed")
+                    raise UpstreamError(stage, attempt, e) from e
+                UPSTREAM_ATTEMPTS.inc(stage=stage, outcome="retry")
+                time.sleep(policy.backoff(attempt))
+
+
+_resilience = None
+_resilience_lock = threading.Lock()
+
+
+def get_resilience() -> Resilience:
+    """Process-wide resilience layer so latency history is shared"""
+    global _resilience
+    with _resilience_lock:
+        if _resilience is None:
+            _resilience = Resilience()
+        return _resilience
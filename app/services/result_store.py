@@ -0,0 +1,198 @@
+import os
+import atexit
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from app.config import RESULT_STORE_MAX_BYTES, RESULT_SPILL_DIR, RESULT_SPILL_MAX_BYTES
+from app.services.image_store import BLOB_HASH
+from app.services.metrics import REGISTRY
+
+RENDITION_FIELDS = ("display", "thumbnail")
+
+
+class ResultStore:
+    """Image bytes behind handles, so sessions and jobs don't each hold a copy.
+
+    Handles are content hashes. Recent bytes stay in a byte-bounded in-memory
+    LRU; the least recently used are spilled to files in spill_dir and read
+    back (and promoted) on demand. When the spill directory is full too, its
+    oldest files are evicted and their handles resolve to None.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_STORE_MAX_BYTES, spill_dir: str = RESULT_SPILL_DIR,
+                 spill_max_bytes: int = RESULT_SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.spill_max_bytes = spill_max_bytes
+        self.spill_dir = spill_dir
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._spilled = OrderedDict()
+        self._spilled_bytes = 0
+        self._lock = threading.Lock()
+        self.spills = 0
+        self.disk_reads = 0
+        self.evictions = 0
+        self.misses = 0
+
+    def _spill_path(self, handle: str) -> str:
+        # Never called with the lock held; concurrent first spills must share one directory
+        with self._lock:
+            if not self.spill_dir:
+                # Private temp dir, removed when the process exits
+                self.spill_dir = tempfile.mkdtemp(prefix="ava_results_")
+                atexit.register(shutil.rmtree, self.spill_dir, True)
+            spill_dir = self.spill_dir
+        os.makedirs(spill_dir, exist_ok=True)
+        return os.path.join(spill_dir, handle)
+
+    def put(self, data: bytes) -> str:
+        """Keep bytes and return their handle"""
+        handle = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._remember(handle, data)
+            victims = self._shrink()
+        self._spill(victims)
+        return handle
+
+    def get(self, handle: str):
+        """Bytes for a handle, from memory or the spill directory; None once evicted"""
+        if not BLOB_HASH.fullmatch(handle or ""):
+            return None
+        with self._lock:
+            data = self._memory.get(handle)
+            if data is not None:
+                self._memory.move_to_end(handle)
+                return data
+            spilled = handle in self._spilled
+        if not spilled:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            with open(self._spill_path(handle), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_reads += 1
+            self._remember(handle, data)
+            victims = self._shrink()
+        self._spill(victims)
+        return data
+
+    def _remember(self, handle: str, data: bytes):
+        if handle in self._memory:
+            self._memory.move_to_end(handle)
+            return
+        self._memory[handle] = data
+        self._memory_bytes += len(data)
+
+    def _shrink(self) -> list:
+        """Drop least recently used bytes from memory; returns those not yet on disk"""
+        victims = []
+        while self._memory and self._memory_bytes > self.max_bytes:
+            handle, data = self._memory.popitem(last=False)
+            self._memory_bytes -= len(data)
+            if handle in self._spilled:
+                self._spilled.move_to_end(handle)
+            else:
+                victims.append((handle, data))
+        return victims
+
+    def _spill(self, victims: list):
+        # Written outside the lock; a handle is only listed as spilled once its file exists
+        for handle, data in victims:
+            if self.spill_max_bytes <= 0 or len(data) > self.spill_max_bytes:
+                with self._lock:
+                    self.evictions += 1
+                continue
+            path = self._spill_path(handle)
+            try:
+                with open(f"{path}.tmp", "wb") as f:
+                    f.write(data)
+                os.replace(f"{path}.tmp", path)
+            except OSError as e:
+                print(f"Result spill failed: {str(e)}")
+                with self._lock:
+                    self.evictions += 1
+                continue
+            with self._lock:
+                self.spills += 1
+                if handle not in self._spilled:
+                    self._spilled[handle] = len(data)
+                    self._spilled_bytes += len(data)
+                removed = []
+                while self._spilled_bytes > self.spill_max_bytes:
+                    old, size = self._spilled.popitem(last=False)
+                    self._spilled_bytes -= size
+                    self.evictions += 1
+                    removed.append(old)
+            for old in removed:
+                try:
+                    os.remove(self._spill_path(old))
+                except FileNotFoundError:
+                    pass
+
+    def stash(self, result: dict) -> dict:
+        """Copy of a result with its image and rendition bytes swapped for handles"""
+        stashed = dict(result)
+        if isinstance(result.get("image"), bytes):
+            stashed["image"] = self.put(result["image"])
+        renditions = result.get("image_renditions")
+        if renditions:
+            stashed["image_renditions"] = {
+                name: self.put(value) if isinstance(value, bytes) else value
+                for name, value in renditions.items()
+            }
+        return stashed
+
+    def load(self, result: dict) -> dict:
+        """Copy of a stashed result with handles resolved to bytes (None once evicted)"""
+        loaded = dict(result)
+        if isinstance(result.get("image"), str):
+            loaded["image"] = self.get(result["image"])
+        renditions = result.get("image_renditions")
+        if renditions:
+            renditions = {
+                name: self.get(value) if name in RENDITION_FIELDS and isinstance(value, str) else value
+                for name, value in renditions.items()
+            }
+            # Half a rendition set is no use; callers fall back to the original
+            loaded["image_renditions"] = renditions if all(renditions.get(name) for name in RENDITION_FIELDS) else None
+        return loaded
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_bytes": self._memory_bytes,
+                "memory_items": len(self._memory),
+                "spilled_bytes": self._spilled_bytes,
+                "spilled_items": len(self._spilled),
+                "spills": self.spills,
+                "disk_reads": self.disk_reads,
+                "evictions": self.evictions,
+                "misses": self.misses
+            }
+
+    def prometheus_lines(self) -> list:
+        """Memory, spill and eviction gauges for the metrics endpoint"""
+        return [f"ava_result_store_{field} {value}" for field, value in self.stats().items()]
+
+
+_result_store = None
+_result_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Process-wide result store shared by every session"""
+    global _result_store
+    with _result_store_lock:
+        if _result_store is None:
+            _result_store = ResultStore()
+            REGISTRY.add_collector(_result_store.prometheus_lines)
+        return _result_store
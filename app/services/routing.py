@@ -0,0 +1,141 @@
+import json
+import threading
+from dataclasses import dataclass, replace
+
+from app.config import (
+    LLM_MODEL_ROUTES,
+    IMAGE_MODEL_ROUTE,
+    MODEL_ROUTING_WINDOW,
+    MODEL_ROUTING_MIN_SAMPLES
+)
+from app.services.metrics import REGISTRY
+from app.services.resilience import LatencyTracker
+
+ROUTE_CHOICES = REGISTRY.counter("ava_model_routes_total", "Model chosen per stage", ("stage", "model"))
+
+
+@dataclass(frozen=True)
+class Route:
+    """Models for one stage in order of preference, plus generation limits.
+
+    The first model whose recent p95 is within p95_budget is used; without
+    a budget, or before enough samples, the first model always is.
+    """
+    models: tuple
+    max_tokens: int = None
+    temperature: float = None
+    p95_budget: float = None
+
+
+LLM_ROUTES = {
+    # Short JSON and prompt rewriting don't need the 72B model
+    "classify": Route(models=("llama-3.2-3b", "dolphin-2.9.2-qwen2-72b"), max_tokens=150, temperature=0.0, p95_budget=4.0),
+    "image_prompt": Route(models=("llama-3.2-3b", "dolphin-2.9.2-qwen2-72b"), max_tokens=300, temperature=0.7, p95_budget=6.0),
+    "image_idea": Route(models=("dolphin-2.9.2-qwen2-72b", "llama-3.2-3b"), max_tokens=350, temperature=0.9, p95_budget=12.0),
+    "general": Route(models=("dolphin-2.9.2-qwen2-72b", "llama-3.2-3b"), max_tokens=400, temperature=0.5, p95_budget=12.0),
+}
+DEFAULT_LLM_ROUTE = Route(models=("dolphin-2.9.2-qwen2-72b",))
+IMAGE_ROUTE = Route(models=("fluently-xl", "flux-dev", "stable-diffusion-3.5"), p95_budget=45.0)
+
+
+def _load_overrides(raw: str) -> dict:
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError as e:
+        print(f"Ignoring invalid model routes: {str(e)}")
+        return {}
+
+
+def _apply_overrides(routes: dict, overrides: dict) -> dict:
+    """Merge {stage: {models, max_tokens, temperature, p95_budget}} into routes"""
+    routes = dict(routes)
+    for stage, fields in overrides.items():
+        if "models" in fields:
+            fields = {**fields, "models": tuple(fields["models"])}
+        routes[stage] = replace(routes.get(stage, DEFAULT_LLM_ROUTE), **fields)
+    return routes
+
+
+class ModelRouter:
+    """Picks a model per stage from its route using recent per-model latency.
+
+    Latency samples expire after `window` seconds, so a preferred model that
+    was routed around gets traffic again once its slow samples age out.
+    """
+
+    def __init__(self, routes: dict, default: Route = None, window: float = MODEL_ROUTING_WINDOW,
+                 min_samples: int = MODEL_ROUTING_MIN_SAMPLES):
+        self.routes = routes
+        self.default = default
+        self.window = window
+        self.min_samples = min_samples
+        self._trackers = {}
+        self._lock = threading.Lock()
+
+    def route(self, stage: str) -> Route:
+        return self.routes.get(stage, self.default)
+
+    def _tracker(self, stage: str, model: str) -> LatencyTracker:
+        with self._lock:
+            key = (stage, model)
+            if key not in self._trackers:
+                self._trackers[key] = LatencyTracker(max_age=self.window)
+            return self._trackers[key]
+
+    def _p95(self, stage: str, model: str):
+        tracker = self._tracker(stage, model)
+        if len(tracker) < self.min_samples:
+            return None
+        return tracker.quantile(0.95)
+
+    def select(self, stage: str) -> str:
+        """Preferred model unless its p95 is over budget, then the first one within it"""
+        route = self.route(stage)
+        model = route.models[0]
+        if route.p95_budget is not None and len(route.models) > 1:
+            observed = [(self._p95(stage, m), m) for m in route.models]
+            within = [m for p95, m in observed if p95 is None or p95 <= route.p95_budget]
+            # Everything over budget: take whichever is currently fastest
+            model = within[0] if within else min(observed)[1]
+        ROUTE_CHOICES.inc(stage=stage, model=model)
+        return model
+
+    def record(self, stage: str, model: str, seconds: float):
+        self._tracker(stage, model).record(seconds)
+
+    def record_failure(self, stage: str, model: str, seconds: float, timeout: float):
+        """Count a failed call as at least a full timeout, so a failing model is routed around"""
+        self.record(stage, model, max(seconds, timeout))
+
+    def stats(self) -> dict:
+        with self._lock:
+            keys = list(self._trackers)
+        return {
+            f"{stage}:{model}": {"samples": len(self._trackers[(stage, model)]), "p95": self._p95(stage, model)}
+            for stage, model in keys
+        }
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def get_llm_router() -> ModelRouter:
+    """Process-wide router for VeniceLLM stages"""
+    with _routers_lock:
+        if "llm" not in _routers:
+            routes = _apply_overrides(LLM_ROUTES, _load_overrides(LLM_MODEL_ROUTES))
+            _routers["llm"] = ModelRouter(routes, DEFAULT_LLM_ROUTE)
+        return _routers["llm"]
+
+
+def get_image_router() -> ModelRouter:
+    """Process-wide router across Venice image models"""
+    with _routers_lock:
+        if "image" not in _routers:
+            overrides = _load_overrides(IMAGE_MODEL_ROUTE)
+            routes = _apply_overrides({"image": IMAGE_ROUTE}, {"image": overrides} if overrides else {})
+            _routers["image"] = ModelRouter(routes, routes["image"])
+        return _routers["image"]
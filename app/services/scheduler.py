@@ -0,0 +1,215 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+
+from app.config import (
+    VENICE_LLM_RATE,
+    VENICE_LLM_BURST,
+    VENICE_IMAGE_RATE,
+    VENICE_IMAGE_BURST,
+    TAVILY_RATE,
+    TAVILY_BURST
+)
+from app.services.metrics import REGISTRY
+
+# Request classes: interactive UI traffic is served before batch jobs
+INTERACTIVE = 0
+BATCH = 1
+
+# Within a class, cheap stages that unblock the rest of the pipeline go first
+STAGE_PRIORITY = {
+    "classify": 0,
+    "search": 1,
+    "general": 1,
+    "image_idea": 2,
+    "image_prompt": 2,
+    "image": 3,
+}
+
+request_class = contextvars.ContextVar("request_class", default=INTERACTIVE)
+
+
+def limits_for(upstream: str):
+    """(rate per second, burst) for an upstream key such as "venice:<model>" """
+    if upstream.startswith("venice-image:"):
+        return VENICE_IMAGE_RATE, VENICE_IMAGE_BURST
+    if upstream.startswith("venice:"):
+        return VENICE_LLM_RATE, VENICE_LLM_BURST
+    if upstream.startswith("tavily"):
+        return TAVILY_RATE, TAVILY_BURST
+    return 0, 0
+
+
+class TokenBucketLimiter:
+    """Token bucket whose waiters are served in priority order.
+
+    A dispatcher thread hands out tokens as they refill, so asyncio tasks on
+    any event loop and plain threads (the Tavily path) share one queue.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self.granted = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        threading.Thread(target=self._dispatch, name=f"limiter-{name}", daemon=True).start()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is free and nobody is queued"""
+        with self._cond:
+            self._refill()
+            if not self._waiters and self._tokens >= 1:
+                self._tokens -= 1
+                self.granted += 1
+                return True
+            return False
+
+    def _enqueue(self, priority: tuple, waiter) -> None:
+        with self._cond:
+            heapq.heappush(self._waiters, (priority, next(self._sequence), time.monotonic(), waiter))
+            self.queued += 1
+            self._cond.notify()
+
+    def _record_wait(self, enqueued: float):
+        waited = time.monotonic() - enqueued
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def _refund(self):
+        with self._cond:
+            self._tokens = min(self.burst, self._tokens + 1)
+            self.granted -= 1
+            self._cond.notify()
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._waiters:
+                    self._cond.wait()
+                self._refill()
+                if self._tokens < 1:
+                    self._cond.wait((1 - self._tokens) / self.rate)
+                    continue
+                _, _, enqueued, waiter = heapq.heappop(self._waiters)
+                self._tokens -= 1
+                self.granted += 1
+                self._record_wait(enqueued)
+            waiter()
+
+    async def acquire(self, priority: tuple):
+        if self.try_acquire():
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            def resolve():
+                if future.done():
+                    # The caller gave up (timeout/cancel); return the token
+                    self._refund()
+                else:
+                    future.set_result(None)
+            try:
+                loop.call_soon_threadsafe(resolve)
+            except RuntimeError:
+                # The waiter's event loop has already closed
+                self._refund()
+
+        self._enqueue(priority, grant)
+        await future
+
+    def acquire_sync(self, priority: tuple):
+        if self.try_acquire():
+            return
+        event = threading.Event()
+        self._enqueue(priority, event.set)
+        event.wait()
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill()
+            return {
+                "queue_depth": len(self._waiters),
+                "tokens": round(self._tokens, 2),
+                "granted": self.granted,
+                "queued": self.queued,
+                "avg_wait": round(self.total_wait / self.queued, 4) if self.queued else 0.0,
+                "max_wait": round(self.max_wait, 4)
+            }
+
+
+class Scheduler:
+    """Process-wide registry of per-upstream, per-model limiters"""
+
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, upstream: str):
+        """Limiter for an upstream key, or None when that upstream is unlimited"""
+        with self._lock:
+            if upstream not in self._limiters:
+                rate, burst = limits_for(upstream)
+                self._limiters[upstream] = TokenBucketLimiter(upstream, rate, burst) if rate > 0 else None
+            return self._limiters[upstream]
+
+    @staticmethod
+    def priority(stage: str) -> tuple:
+        return request_class.get(), STAGE_PRIORITY.get(stage, len(STAGE_PRIORITY))
+
+    async def acquire(self, upstream: str, stage: str):
+        limiter = self.limiter(upstream)
+        if limiter:
+            await limiter.acquire(self.priority(stage))
+
+    def acquire_sync(self, upstream: str, stage: str):
+        limiter = self.limiter(upstream)
+        if limiter:
+            limiter.acquire_sync(self.priority(stage))
+
+    def try_acquire(self, upstream: str) -> bool:
+        limiter = self.limiter(upstream)
+        return limiter.try_acquire() if limiter else True
+
+    def stats(self) -> dict:
+        """Queue depth and wait times for each limited upstream"""
+        with self._lock:
+            limiters = [l for l in self._limiters.values() if l]
+        return {limiter.name: limiter.stats() for limiter in limiters}
+
+    def prometheus_lines(self) -> list:
+        """Queue depth and wait gauges for the metrics endpoint"""
+        lines = []
+        for name, stats in self.stats().items():
+            for field in ("queue_depth", "tokens", "avg_wait", "max_wait"):
+                lines.append(f'ava_scheduler_{field}{{upstream="{name}"}} {stats[field]}')
+        return lines
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+            REGISTRY.add_collector(_scheduler.prometheus_lines)
+        return _scheduler
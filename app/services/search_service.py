@@ -1,37 +1,168 @@
-from tavily import TavilyClient
-from app.config import TAVILY_API_KEY
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from app.config import (
+    TAVILY_API_KEY,
+    TAVILY_API_BASE,
+    SEARCH_CONTEXT_TOKENS,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_MAX_STALE,
+    SEARCH_CACHE_SIZE,
+    SEARCH_ADAPTIVE,
+    SEARCH_FANOUT,
+    SEARCH_MAX_RESULTS,
+    SEARCH_MIN_CHARS,
+    SEARCH_MIN_RELEVANCE
+)
+from app.services.cache import StaleWhileRevalidateCache
+from app.services.resilience import Resilience, get_resilience
+from app.services.singleflight import SingleFlight, get_single_flight
+from app.services.metrics import PAYLOAD_BYTES, REGISTRY
+from app.utils.compaction import compact, term_coverage
+
+SEARCH_DEPTHS = REGISTRY.counter("ava_search_depth_total", "Searches answered per Tavily depth", ("depth",))
+
+def normalize_query(text: str) -> str:
+    """Lowercase and collapse whitespace so equivalent queries share a cache key"""
+    return " ".join((text or "").lower().split())
+
+def search_queries(dao_name: str, dao_info: str, fanout: bool = SEARCH_FANOUT) -> list:
+    """The main query (name and keywords) first, then fan-out variants, without repeats"""
+    queries = [f"{dao_name} {dao_info}" if dao_info else f"{dao_name}"]
+    if fanout:
+        queries += [f"{dao_name}", f"{dao_name} governance"]
+    return list(dict.fromkeys(queries))
+
+def merge_results(*result_lists, ranked: bool = True) -> list:
+    """Tavily results from several searches, deduplicated by URL.
+
+    Ranked: best score first, keeping the higher-scored copy of a URL.
+    Otherwise the first copy is kept and the lists keep their order.
+    """
+    merged = {}
+    for results in result_lists:
+        for result in results:
+            url = (result.get("url") or "").rstrip("/") or str(id(result))
+            if url not in merged or (ranked and (result.get("score") or 0) > (merged[url].get("score") or 0)):
+                merged[url] = result
+    if not ranked:
+        return list(merged.values())
+    return sorted(merged.values(), key=lambda r: r.get("score") or 0, reverse=True)
+
+def _content(results: list) -> str:
+    return " ".join(r.get("content") or "" for r in results[:SEARCH_MAX_RESULTS]).strip()
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache() -> StaleWhileRevalidateCache:
+    """Process-wide search cache so results survive Streamlit reruns"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = StaleWhileRevalidateCache(
+                ttl=SEARCH_CACHE_TTL,
+                max_stale=SEARCH_CACHE_MAX_STALE,
+                max_entries=SEARCH_CACHE_SIZE,
+                name="search"
+            )
+        return _search_cache
 
 class SearchService:
     """Service for searching DAO information using Tavily"""
     
-    def __init__(self):
-        self.client = TavilyClient(api_key=TAVILY_API_KEY)
+    def __init__(self, cache: StaleWhileRevalidateCache = None, resilience: Resilience = None, flight: SingleFlight = None):
+        self._client = None
+        self.cache = cache or get_search_cache()
+        self.resilience = resilience or get_resilience()
+        self.flight = flight or get_single_flight()
+
+    @property
+    def client(self):
+        """Tavily client, imported and built on first search to keep startup fast"""
+        if self._client is None:
+            from tavily import TavilyClient
+            # Only pass a base URL when overridden; the client's default is the live API
+            options = {"api_base_url": TAVILY_API_BASE} if TAVILY_API_BASE else {}
+            self._client = TavilyClient(api_key=TAVILY_API_KEY, **options)
+        return self._client
 
     def search_dao(self, dao_name: str, dao_info:str) -> dict:
         """Search for comprehensive DAO information"""
 
         try:
-            query = (
-                f"{dao_name}"
-            )
-            if dao_info:
-                query += f" {dao_info}"
+            key = (normalize_query(dao_name), normalize_query(dao_info))
+            def fetch():
+                # Concurrent misses for the same DAO share one Tavily request
+                return self.flight.do_sync(repr(key), lambda: self._search(dao_name, dao_info), name="search")
 
-            results = self.client.search(
-                query=query,
-                search_depth="advanced",
-                max_results=2
-            )
-            answers = [result_dict.get("content") for result_dict in results.get("results")]
-            answer = answers[0] if len(answers)>0 else ""
-            answer = answer + " " + answers[1] if len(answers)>1 else answer
-            return {
-                "summary": answer,
-                "urls": [r.get('url') for r in results.get('results', [])][:2]
-            }
+            return self.cache.get_or_fetch(key, fetch)
         except Exception as e:
             print(f"Search error: {str(e)}")
             return {
                 "summary": "Unable to fetch DAO information at this time.",
                 "urls": []
-            } 
+            }
+
+    def _tavily(self, query: str, depth: str) -> list:
+        results = self.resilience.call_sync("search", lambda: self.client.search(
+            query=query,
+            search_depth=depth,
+            max_results=SEARCH_MAX_RESULTS,
+            timeout=self.resilience.policy("search").timeout
+        ), upstream="tavily")
+        return results.get("results") or []
+
+    def _fan_out(self, queries: list, depth: str) -> list:
+        """Search every query at once; only the main (first) query must succeed"""
+        if len(queries) == 1:
+            return self._tavily(queries[0], depth)
+        with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="search-fanout") as pool:
+            # Each search keeps the caller's trace id and request class
+            futures = [pool.submit(contextvars.copy_context().run, self._tavily, query, depth) for query in queries]
+            result_lists = [futures[0].result()]
+            for query, future in zip(queries[1:], futures[1:]):
+                try:
+                    result_lists.append(future.result())
+                except Exception as e:
+                    print(f"Search variant \"{query}\" failed: {str(e)}")
+        return merge_results(*result_lists)
+
+    def _sufficient(self, results: list, query: str) -> bool:
+        """Enough content, and about the query, to summarize without a deeper search"""
+        content = _content(results)
+        return len(content) >= SEARCH_MIN_CHARS and term_coverage(content, query) >= SEARCH_MIN_RELEVANCE
+
+    def _search(self, dao_name: str, dao_info: str) -> dict:
+        """Run the Tavily search; raises on failure so errors are never cached"""
+        queries = search_queries(dao_name, dao_info)
+        query = queries[0]
+
+        if not SEARCH_ADAPTIVE:
+            depth, results = "advanced", self._fan_out(queries, "advanced")
+        else:
+            # Basic is the fast tier and enough for well-known DAOs
+            depth, results = "basic", self._fan_out(queries, "basic")
+            if not self._sufficient(results, query):
+                # Thin or off-topic: one advanced search for the main query, ahead of the basic results
+                try:
+                    depth, results = "advanced", merge_results(self._tavily(query, "advanced"), results, ranked=False)
+                except Exception as e:
+                    if not results:
+                        raise
+                    # Thin results beat no answer at all
+                    print(f"Advanced search failed, keeping basic results: {str(e)}")
+        SEARCH_DEPTHS.inc(depth=depth)
+
+        results = results[:SEARCH_MAX_RESULTS]
+        answer = _content(results)
+        PAYLOAD_BYTES.observe(len(answer.encode("utf-8")), stage="search", direction="response")
+        # Deduplicated extract within the token budget, for LLM prompts only
+        context = compact(answer, SEARCH_CONTEXT_TOKENS, focus=query)
+        PAYLOAD_BYTES.observe(len(context.encode("utf-8")), stage="search_context", direction="response")
+        return {
+            "summary": answer,
+            "context": context,
+            "urls": [r.get('url') for r in results]
+        }
+
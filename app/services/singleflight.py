@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+
+from app.services.metrics import CACHE_EVENTS
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one in-flight upstream request.
+
+    The first caller for a key starts the work; callers that arrive while it
+    is running wait on the same result (or exception). When every caller has
+    given up (been cancelled), the work is cancelled too. Nothing is kept
+    once the call finishes, so this complements rather than replaces caching.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._futures = {}
+        self._waiters = defaultdict(int)
+        self._lock = threading.Lock()
+        self.coalesced = defaultdict(int)
+        self.leaders = defaultdict(int)
+
+    async def do(self, key: str, fn, name: str = "default"):
+        """Await fn() (a coroutine factory), sharing it with concurrent callers of key"""
+        loop = asyncio.get_running_loop()
+        # Tasks belong to one loop; callers on another loop get their own flight
+        flight_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(flight_key)
+            if task is None:
+                task = loop.create_task(fn())
+                self._tasks[flight_key] = task
+                task.add_done_callback(lambda _: self._forget(self._tasks, flight_key, task))
+                self.leaders[name] += 1
+            else:
+                self.coalesced[name] += 1
+                CACHE_EVENTS.inc(cache="singleflight", stage=name, outcome="coalesced")
+            self._waiters[task] += 1
+        try:
+            # Shield so one caller giving up doesn't cancel the others' request
+            return await asyncio.shield(task)
+        finally:
+            with self._lock:
+                self._waiters[task] -= 1
+                abandoned = self._waiters[task] == 0
+                if abandoned:
+                    del self._waiters[task]
+                    if not task.done() and self._tasks.get(flight_key) is task:
+                        # Later callers start a fresh flight instead of joining a cancelled one
+                        del self._tasks[flight_key]
+            # Nobody is waiting any more, so don't keep the upstream request (or its rate-limit tokens)
+            if abandoned and not task.done():
+                task.cancel()
+
+    def do_sync(self, key: str, fn, name: str = "default"):
+        """Blocking variant for callers running in worker threads"""
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._futures[key] = future
+                self.leaders[name] += 1
+            else:
+                self.coalesced[name] += 1
+                CACHE_EVENTS.inc(cache="singleflight", stage=name, outcome="coalesced")
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            self._forget(self._futures, key, future)
+        return future.result()
+
+    def _forget(self, flights: dict, key, flight):
+        with self._lock:
+            if flights.get(key) is flight:
+                del flights[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {"leaders": self.leaders[name], "coalesced": self.coalesced[name]}
+                for name in set(self.leaders) | set(self.coalesced)
+            }
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Process-wide coalescer shared by the Venice and Tavily services"""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
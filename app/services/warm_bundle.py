@@ -0,0 +1,176 @@
+import os
+import json
+import mmap
+import time
+import uuid
+import shutil
+import threading
+
+from app.config import WARM_BUNDLE_DIR
+from app.services.query_cache import canonicalize
+
+INDEX_FILE = "index.json"
+BLOB_FILE = "images.bin"
+# Names the build directory in use; replaced atomically when a build finishes
+CURRENT_FILE = "CURRENT"
+# Builds kept on disk: the new one and the one before it, for processes still opening it
+KEEP_BUILDS = 2
+BUNDLE_VERSION = 3
+IMAGE_FIELDS = ("image", "display", "thumbnail")
+
+
+def build_dir(directory: str):
+    """The build directory CURRENT points at, or None when nothing has been built"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            build = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, build) if build else None
+
+
+class BundleWriter:
+    """Writes a warm bundle: results in index.json, image bytes back to back in images.bin.
+
+    Each build goes into its own subdirectory, and CURRENT is switched to it
+    with one atomic rename at close. A reader therefore always pairs an
+    index with the blob file it was written with. Older builds are removed;
+    processes that already mapped one keep their mapping.
+    """
+
+    def __init__(self, directory: str = WARM_BUNDLE_DIR):
+        self.directory = directory
+        self.build = f"build-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.build_dir = os.path.join(directory, self.build)
+        os.makedirs(self.build_dir, exist_ok=True)
+        self._blobs = open(os.path.join(self.build_dir, BLOB_FILE), "wb")
+        self._offset = 0
+        self.entries = []
+
+    def _write_blob(self, data: bytes) -> list:
+        self._blobs.write(data)
+        span = [self._offset, len(data)]
+        self._offset += len(data)
+        return span
+
+    def add(self, query: str, style: str, result: dict, aliases: list = (), ambiguous: list = ()):
+        """Record a successful agent result for a query and the names it answers.
+
+        Names in ambiguous are everyday words ("compound", "mantle") that
+        only mean the DAO in context, so they never become lookup keys.
+        """
+        renditions = result.get("image_renditions") or {}
+        images = {"image": result["image"], "display": renditions.get("display"), "thumbnail": renditions.get("thumbnail")}
+        keys = {canonicalize(text) for text in [query, *aliases]} - {canonicalize(text) for text in ambiguous} - {""}
+        self.entries.append({
+            "query": query,
+            "style": style,
+            "keys": sorted(keys),
+            "result": {
+                "success": True,
+                "response": result["response"],
+                "dao_info": result.get("dao_info"),
+                "image_prompt": result.get("image_prompt")
+            },
+            "mime": renditions.get("mime"),
+            "blobs": {name: self._write_blob(data) for name, data in images.items() if data}
+        })
+
+    def close(self):
+        self._blobs.flush()
+        os.fsync(self._blobs.fileno())
+        self._blobs.close()
+        with open(os.path.join(self.build_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+            # The blob size lets a reader reject a mismatched images.bin
+            json.dump({"version": BUNDLE_VERSION, "blob_bytes": self._offset, "entries": self.entries}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        current_tmp = os.path.join(self.directory, f"{CURRENT_FILE}.tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(self.build)
+        os.replace(current_tmp, os.path.join(self.directory, CURRENT_FILE))
+        self._remove_old_builds()
+
+    def _remove_old_builds(self):
+        builds = sorted(
+            (name for name in os.listdir(self.directory)
+             if name.startswith("build-") and os.path.isdir(os.path.join(self.directory, name))),
+            key=lambda name: os.path.getmtime(os.path.join(self.directory, name))
+        )
+        for name in builds[:-KEEP_BUILDS]:
+            if name != self.build:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+class WarmBundle:
+    """Read-only view of a warm bundle with its image file memory-mapped.
+
+    Every worker process maps the same file, so the images live once in the
+    OS page cache rather than once per process. Lookups match the
+    canonicalized query (see query_cache.canonicalize) per style. directory
+    is the bundle root; the build CURRENT names is loaded.
+    """
+
+    def __init__(self, directory: str = WARM_BUNDLE_DIR):
+        path = build_dir(directory)
+        if path is None:
+            raise ValueError(f"No warm bundle build in {directory}")
+        with open(os.path.join(path, INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported warm bundle version: {index.get('version')}")
+        self.entries = index["entries"]
+        self._keys = {}
+        for entry in self.entries:
+            for key in entry["keys"]:
+                self._keys.setdefault((entry["style"], key), entry)
+        with open(os.path.join(path, BLOB_FILE), "rb") as f:
+            if os.fstat(f.fileno()).st_size != index["blob_bytes"]:
+                raise ValueError("Warm bundle images.bin doesn't match its index")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+        self.hits = 0
+        self.misses = 0
+
+    def _blob(self, entry: dict, name: str):
+        span = entry["blobs"].get(name)
+        if span is None or self._map is None:
+            return None
+        offset, length = span
+        return self._map[offset:offset + length]
+
+    def get(self, query: str, style: str):
+        """Precomputed result for this query and style, or None"""
+        entry = self._keys.get((style, canonicalize(query)))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result = dict(entry["result"])
+        result["image"] = self._blob(entry, "image")
+        display, thumbnail = self._blob(entry, "display"), self._blob(entry, "thumbnail")
+        result["image_renditions"] = (
+            {"display": display, "thumbnail": thumbnail, "mime": entry["mime"]} if display and thumbnail else None
+        )
+        return result
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "keys": len(self._keys), "hits": self.hits, "misses": self.misses}
+
+
+_bundle = None
+_bundle_loaded = False
+_bundle_lock = threading.Lock()
+
+
+def get_warm_bundle():
+    """Process-wide warm bundle, or None when none has been built"""
+    global _bundle, _bundle_loaded
+    with _bundle_lock:
+        if not _bundle_loaded:
+            _bundle_loaded = True
+            if WARM_BUNDLE_DIR and build_dir(WARM_BUNDLE_DIR):
+                try:
+                    _bundle = WarmBundle(WARM_BUNDLE_DIR)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Warm bundle not loaded: {str(e)}")
+        return _bundle
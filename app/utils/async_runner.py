@@ -0,0 +1,59 @@
+import queue
+import asyncio
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, starting its thread on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="ava-lens-loop", daemon=True)
+            thread.start()
+        return _loop
+
+
+def run_sync(coro, timeout: float = None):
+    """Run a coroutine on the shared loop and block the calling thread for its result.
+
+    Streamlit script threads use this instead of asyncio.run so every session
+    shares one loop and therefore one pooled HTTP client.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    return future.result(timeout)
+
+
+def iter_sync(agen, timeout: float = None):
+    """Iterate an async generator from a synchronous thread via the shared loop.
+
+    The generator runs as a single task, so context variables (the trace id)
+    persist across items and the pipeline keeps working while the caller
+    renders. Abandoning the iterator cancels the task.
+    """
+    items = queue.Queue()
+    end = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+            items.put((end, None))
+        except BaseException as e:
+            items.put((end, e))
+            raise
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_event_loop())
+    try:
+        while True:
+            item, error = items.get(timeout=timeout)
+            if error is not None:
+                raise error
+            if item is end:
+                return
+            yield item
+    finally:
+        future.cancel()
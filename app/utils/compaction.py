@@ -0,0 +1,97 @@
+import re
+import math
+from collections import Counter
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n+")
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "for", "to", "in", "on", "at", "by", "with",
+    "from", "as", "is", "are", "was", "were", "be", "been", "it", "its", "this", "that",
+    "these", "those", "which", "who", "has", "have", "had", "can", "will", "also", "their",
+    "they", "than", "such", "into", "more", "most", "other", "about", "not", "all"
+}
+# Sentences sharing this much of their vocabulary count as duplicates
+DUPLICATE_OVERLAP = 0.8
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return math.ceil(len(text) / 4)
+
+
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in SENTENCE_SPLIT.split(text or "") if s and s.strip()]
+
+
+def _terms(sentence: str) -> list:
+    return [w for w in WORD.findall(sentence.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def term_coverage(text: str, focus: str) -> float:
+    """Share of focus terms (e.g. a DAO name and query keywords) that occur in text"""
+    wanted = set(_terms(focus or ""))
+    if not wanted:
+        return 1.0
+    return len(wanted & set(_terms(text or ""))) / len(wanted)
+
+
+def _truncate(text: str, budget_tokens: int) -> str:
+    """Cut text to the budget, at a word boundary when there is one"""
+    cut = text[:budget_tokens * 4]
+    if len(cut) < len(text) and " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut
+
+
+def compact(text: str, budget_tokens: int, focus: str = None) -> str:
+    """Extractive summary of text within budget_tokens, sentences kept in order.
+
+    Sentences are deduplicated, then scored by how frequent their terms are
+    across the whole text (centrality), with a boost for terms from focus
+    (the DAO name and query keywords) and a slight preference for earlier
+    sentences. The best sentences are taken greedily until the budget is used.
+    """
+    if not text or budget_tokens <= 0 or estimate_tokens(text) <= budget_tokens:
+        return text
+
+    sentences = []
+    seen = []
+    for sentence in split_sentences(text):
+        terms = set(_terms(sentence))
+        if not terms:
+            # No Latin-script terms (e.g. CJK content): keep it, deduplicated exactly
+            if sentence not in sentences:
+                sentences.append(sentence)
+            continue
+        if any(len(terms & other) / len(terms | other) >= DUPLICATE_OVERLAP for other in seen):
+            continue
+        seen.append(terms)
+        sentences.append(sentence)
+
+    if not sentences:
+        return _truncate(text, budget_tokens)
+
+    frequency = Counter(term for sentence in sentences for term in set(_terms(sentence)))
+    focus_terms = set(_terms(focus or ""))
+
+    def score(index: int, sentence: str) -> float:
+        terms = _terms(sentence)
+        centrality = sum(frequency[t] for t in terms) / math.sqrt(len(terms)) if terms else 0.0
+        relevance = sum(2.0 for t in set(terms) if t in focus_terms)
+        position = 1.0 / (1 + index * 0.1)
+        return centrality + relevance + position
+
+    ranked = sorted(range(len(sentences)), key=lambda i: score(i, sentences[i]), reverse=True)
+    chosen = []
+    used = 0
+    for index in ranked:
+        cost = estimate_tokens(sentences[index]) + 1
+        if used + cost > budget_tokens:
+            continue
+        chosen.append(index)
+        used += cost
+
+    if not chosen:
+        # Even the best sentence is over budget
+        return _truncate(sentences[ranked[0]], budget_tokens)
+    return " ".join(sentences[i] for i in sorted(chosen))
@@ -0,0 +1,48 @@
+import io
+
+from app.config import (
+    IMAGE_DISPLAY_FORMAT,
+    IMAGE_DISPLAY_SIZE,
+    IMAGE_DISPLAY_QUALITY,
+    IMAGE_THUMBNAIL_SIZE
+)
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+
+def _encode(image, size: int, image_format: str, quality: int) -> bytes:
+    rendition = image.copy()
+    rendition.thumbnail((size, size))
+    if image_format == "JPEG" and rendition.mode not in ("RGB", "L"):
+        rendition = rendition.convert("RGB")
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def make_renditions(
+    image_bytes: bytes,
+    image_format: str = IMAGE_DISPLAY_FORMAT,
+    display_size: int = IMAGE_DISPLAY_SIZE,
+    thumbnail_size: int = IMAGE_THUMBNAIL_SIZE,
+    quality: int = IMAGE_DISPLAY_QUALITY
+) -> dict:
+    """Re-encode a generated image into a browser display size and a thumbnail.
+
+    Returns {"display", "thumbnail", "mime"} or None if the bytes can't be decoded.
+    """
+    # Pillow is only needed here; keep it out of the import path until used
+    from PIL import Image
+
+    image_format = image_format.upper()
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image.load()
+            return {
+                "display": _encode(image, display_size, image_format, quality),
+                "thumbnail": _encode(image, thumbnail_size, image_format, quality),
+                "mime": MIME_TYPES.get(image_format, "application/octet-stream")
+            }
+    except Exception as e:
+        print(f"Image rendition failed: {str(e)}")
+        return None
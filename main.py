@@ -1,8 +1,12 @@
 import streamlit as st
-import asyncio
-from app.services.search_service import SearchService
-from app.services.image_service import ImageService, VeniceAiModelStyles
+from app.services.image_service import DEFAULT_SEED, VeniceAiModelsEnum, VeniceAiModelStyles
 from app.services.agent_service import DAOAgent
+from app.config import IMAGE_JOB_POLL_INTERVAL, VARIANT_MAX
+from app.services.image_jobs import PENDING, RUNNING
+from app.services.providers import get_agent, get_image_jobs
+from app.services.metrics import start_metrics_server
+from app.services.result_store import get_result_store
+from app.utils.async_runner import iter_sync
 
 def setup_page():
     st.set_page_config(
@@ -33,8 +37,196 @@ def apply_custom_css():
         </style>
     """, unsafe_allow_html=True)
 
-async def process_query(agent: DAOAgent, query: str, style:str="abstract"):
-    return await agent.process_query(query=query, style=style)
+def render_links(urls):
+    st.markdown("### 🔗 Relevant Links")
+    for url in urls:
+        st.markdown(f"- [{url}]({url})")
+
+def render_image(image: bytes, renditions: dict, image_prompt: str = None):
+    """Show a generated image, its prompt and a download of the original"""
+    if not image:
+        st.error("🎨 Failed to generate image.")
+        return
+    # Send the browser the lighter rendition; the PNG is only for download
+    st.image(renditions["display"] if renditions else image)
+    if image_prompt:
+        st.markdown("### 🎨 Image Prompt")
+        st.write(image_prompt)
+    st.download_button(
+        "⬇️ Download original",
+        data=image,
+        file_name="ava_lens.png",
+        mime="image/png"
+    )
+
+def render_preview(job: dict):
+    renditions = job.get("image_renditions")
+    st.image(renditions["display"] if renditions else job["image"], caption="Preview · rendering full quality...")
+
+@st.fragment(run_every=IMAGE_JOB_POLL_INTERVAL)
+def poll_image_job(job_id: str):
+    """Refresh only the image area until the background job finishes"""
+    job = get_image_jobs().status(job_id)
+    if job is None:
+        st.error("🎨 Image is no longer available.")
+    elif job["status"] in (PENDING, RUNNING):
+        if job.get("image"):
+            render_preview(job)
+        else:
+            st.info("🎮 Generating Your DAO Character......")
+    else:
+        # One full rerun renders the finished result without this timer
+        st.rerun()
+
+def refine_image(spec: dict):
+    """Queue the full render of a preview and show that job instead"""
+    st.session_state["last_view"]["image_job"] = get_image_jobs().submit(spec)
+
+def render_image_job(job_id: str):
+    job = get_image_jobs().status(job_id)
+    if job is not None and job["status"] not in (PENDING, RUNNING):
+        render_image(job.get("image"), job.get("image_renditions"), job.get("image_prompt"))
+        if job.get("refine"):
+            st.button("✨ Render full quality", on_click=refine_image, args=(job["refine"],))
+    else:
+        poll_image_job(job_id)
+
+def build_variants(style: str, extra_styles: list, models: list, seed_count: int) -> list:
+    """Every style x model x seed combination, capped at VARIANT_MAX"""
+    styles = [style] + [s for s in extra_styles if s != style]
+    variants = [
+        {"style": s, "model": m, "seed": DEFAULT_SEED + n}
+        for s in styles for m in (models or [None]) for n in range(seed_count)
+    ]
+    return variants[:VARIANT_MAX]
+
+def variant_caption(variant: dict) -> str:
+    return " · ".join(str(v) for v in (variant["style"], variant.get("model"), f"seed {variant['seed']}") if v)
+
+def render_variant(item: dict):
+    if not item["image"]:
+        st.error(f"🎨 {variant_caption(item['variant'])} failed.")
+        return
+    renditions = item.get("image_renditions")
+    st.image(renditions["display"] if renditions else item["image"], caption=variant_caption(item["variant"]))
+    st.download_button(
+        "⬇️ Download original",
+        data=item["image"],
+        file_name=f"ava_lens_{item['index'] + 1}.png",
+        mime="image/png",
+        key=f"variant-{item['index']}"
+    )
+
+def gallery_slots(count: int) -> list:
+    """One placeholder per variant, laid out three to a row"""
+    columns = st.columns(min(count, 3))
+    return [columns[index % len(columns)].empty() for index in range(count)]
+
+def render_saved(view: dict):
+    """Re-render the last answer on reruns, e.g. once its image is ready.
+
+    Saved variants hold result store handles, not image bytes.
+    """
+    st.write("")
+    info_col, image_col = st.columns([3, 2])
+    with info_col:
+        if view.get("error"):
+            st.error(f"❌ Error: {view['error']}")
+        else:
+            st.write(view.get("summary", ""))
+        if view.get("urls"):
+            render_links(view["urls"])
+    if view.get("image_job"):
+        with image_col:
+            render_image_job(view["image_job"])
+    if "image" in view:
+        with image_col:
+            saved = view["image"]
+            image = get_result_store().load(saved)
+            if saved["image"] and not image["image"]:
+                st.info("🎨 Image is no longer available.")
+            else:
+                render_image(image["image"], image["image_renditions"], view.get("image_prompt"))
+    if view.get("variants"):
+        with image_col:
+            st.markdown("### 🎨 Image Prompt")
+            st.write(view.get("image_prompt"))
+        results = get_result_store()
+        for slot, saved in zip(gallery_slots(len(view["variants"])), sorted(view["variants"], key=lambda item: item["index"])):
+            item = results.load(saved)
+            with slot.container():
+                if saved["image"] and not item["image"]:
+                    st.info(f"🎨 {variant_caption(item['variant'])} is no longer available.")
+                else:
+                    render_variant(item)
+
+def render_stream(agent: DAOAgent, query: str, style: str, variants: list = None):
+    """Render agent events as they arrive: text first, the image when it is ready.
+
+    The image is rendered by a background job, so this script thread is
+    released once the text is done; the image area polls for the result.
+    With several variants, they render concurrently into a gallery instead.
+    """
+    st.write("")
+    info_col, image_col = st.columns([3, 2])
+    with info_col:
+        summary_area = st.empty()
+        links_area = st.container()
+    with image_col:
+        image_area = st.empty()
+        prompt_area = st.container()
+    gallery_area = st.container()
+    slots = []
+
+    summary_area.info("🔎 Looking into your question...")
+    previous = st.session_state.get("last_view") or {}
+    if previous.get("image_job"):
+        # The user has moved on; don't spend a full render on the old image
+        get_image_jobs().skip(previous["image_job"])
+    view = {"summary": ""}
+    st.session_state["last_view"] = view
+    events = agent.stream_query(query=query, style=style, background_image=True, variants=variants)
+    for event in iter_sync(events):
+        if event["type"] == "summary":
+            view["summary"] += event["text"]
+            summary_area.write(view["summary"])
+        elif event["type"] == "urls" and event["urls"]:
+            view["urls"] = event["urls"]
+            with links_area:
+                render_links(event["urls"])
+        elif event["type"] == "message":
+            view["summary"] = event["text"]
+            summary_area.write(event["text"])
+        elif event["type"] == "image_job":
+            view["image_job"] = event["job_id"]
+            with image_area.container():
+                poll_image_job(event["job_id"])
+        elif event["type"] == "image_prompt":
+            view["image_prompt"] = event["image_prompt"]
+            with prompt_area:
+                st.markdown("### 🎨 Image Prompt")
+                st.write(event["image_prompt"])
+            if variants:
+                with gallery_area:
+                    slots = gallery_slots(len(variants))
+                for slot in slots:
+                    slot.info("🎮 Rendering...")
+                view["variants"] = []
+            else:
+                image_area.info("🎮 Generating Your DAO Character......")
+        elif event["type"] == "variant":
+            # Session state keeps handles; the bytes live in the shared result store
+            view["variants"].append(get_result_store().stash(event))
+            with slots[event["index"]].container():
+                render_variant(event)
+        elif event["type"] == "image":
+            # Kept as handles so reruns (e.g. the download button) can redraw it
+            view["image"] = get_result_store().stash({"image": event["image"], "image_renditions": event.get("image_renditions")})
+            with image_area.container():
+                render_image(event["image"], event.get("image_renditions"))
+        elif event["type"] == "done" and not event["result"]["success"]:
+            view["error"] = event["result"]["error"]
+            summary_area.error(f"❌ Error: {event['result']['error']}")
 
 available_styles = [style.value for style in VeniceAiModelStyles]
 
@@ -60,10 +252,9 @@ def main():
     # Add spacing
     st.write("")
 
-    # Initialize services
-    search_service = SearchService()
-    image_service = ImageService()
-    agent = DAOAgent(search_service, image_service)
+    # Services are built once per process and shared across reruns
+    agent = get_agent()
+    start_metrics_server()
 
     # Main input area
     left_col, right_col = st.columns([2, 1])
@@ -83,6 +274,10 @@ def main():
             options=style_options,
             index=style_options.index("3D Model")
         )
+        with st.expander("🎲 Compare variants"):
+            extra_styles = st.multiselect("More styles", options=style_options)
+            models = st.multiselect("Models", options=[model.value for model in VeniceAiModelsEnum])
+            seed_count = st.number_input("Seeds each", min_value=1, max_value=4, value=1)
 
     # Generate button
     st.write("")
@@ -95,36 +290,14 @@ def main():
             st.warning("🤔 Please enter a query first!")
             return
             
-        with st.spinner("🎮 Generating Your DAO Character......"):
-            try:
-                response = asyncio.run(process_query(agent, query, selected_style))
-                
-                if response["success"]:
-                    if response.get("dao_info"):
-                        st.write("")
-                        info_col, image_col = st.columns([3, 2])
-                        
-                        with info_col:
-                            st.write(response["dao_info"]["summary"])
-                            
-                            if response["dao_info"].get("urls"):
-                                st.markdown("### 🔗 Relevant Links")
-                                for url in response["dao_info"]["urls"]:
-                                    st.markdown(f"- [{url}]({url})")
-                        
-                        with image_col:
-                            if response.get("image"):
-                                st.image(response["image"])
-                                st.markdown("### 🎨 Image Prompt")
-                                st.write(response.get("image_prompt"))
-                            else:
-                                st.error("🎨 Failed to generate image.")
-                    else:
-                        st.write(response["response"])
-                else:
-                    st.error(f"❌ Error: {response['error']}")
-            except Exception as e:
-                st.error(f"❌ An error occurred: {str(e)}")
+        try:
+            variants = build_variants(selected_style, extra_styles, models, int(seed_count))
+            # One combination is the normal single image
+            render_stream(agent, query, selected_style, variants if len(variants) > 1 else None)
+        except Exception as e:
+            st.error(f"❌ An error occurred: {str(e)}")
+    elif "last_view" in st.session_state:
+        render_saved(st.session_state["last_view"])
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
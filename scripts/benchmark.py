@@ -0,0 +1,208 @@
+"""Offline load benchmark for DAOAgent.process_query.
+
+Starts the local Venice/Tavily stand-in (scripts/stub_upstreams.py) in a
+separate process, points the app at it, and drives process_query at a fixed
+concurrency. Reports end-to-end p50/p95/p99, throughput, per-stage medians
+and the benchmark process's peak RSS. No network or API keys needed:
+
+    python scripts/benchmark.py --requests 200 --concurrency 16 --image-latency 2:0.3
+    python scripts/benchmark.py --json results.json    # for comparing runs in CI
+
+Caches live in a throwaway directory, and by default every query is distinct
+so each request exercises the full upstream path; --distinct makes queries
+repeat to measure the cached path. Rate limits are disabled unless
+--keep-limits is given, so the numbers reflect the pipeline itself.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import asyncio
+import tempfile
+import resource
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_upstreams import parse_latency, StubConfig
+
+KNOWN = ["Uniswap", "MakerDAO", "Aave", "Compound", "ENS", "Gitcoin", "Lido", "Arbitrum"]
+QUERY_TEMPLATES = [
+    "Tell me about {name} governance #{n}",
+    "How does the {name} treasury work? #{n}",
+    "Describe ZetaDAO{n} and its community",
+    "What is a DAO for {topic} #{n}",
+]
+TOPICS = ["gaming", "music", "climate", "science", "art", "open source"]
+
+
+def make_queries(count: int, distinct: int) -> list:
+    """Deterministic mix of known-DAO, unknown-DAO and general queries"""
+    queries = []
+    for index in range(count):
+        n = index % distinct
+        template = QUERY_TEMPLATES[n % len(QUERY_TEMPLATES)]
+        queries.append(template.format(name=KNOWN[n % len(KNOWN)], topic=TOPICS[n % len(TOPICS)], n=n))
+    return queries
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(args) -> tuple:
+    """Launch the stub in its own process so its memory isn't counted"""
+    port = free_port()
+    command = [
+        sys.executable, os.path.join(ROOT, "scripts", "stub_upstreams.py"), "--port", str(port),
+        "--llm-latency", args.llm_latency, "--image-latency", args.image_latency,
+        "--search-latency", args.search_latency, "--error-rate", str(args.error_rate),
+        "--completion-words", str(args.completion_words), "--search-bytes", str(args.search_bytes),
+        "--image-bytes", str(args.image_bytes)
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("stub server did not start")
+
+
+def configure_environment(url: str, keep_limits: bool, cache_dir: str):
+    """Must run before anything under app/ is imported"""
+    os.environ.update({
+        "VENICE_API_BASE": url,
+        "TAVILY_API_BASE": url,
+        "VENICE_API_KEY": os.environ.get("VENICE_API_KEY") or "benchmark",
+        "TAVILY_API_KEY": os.environ.get("TAVILY_API_KEY") or "benchmark",
+        "CACHE_DIR": cache_dir,
+        "METRICS_PORT": "0",
+    })
+    if not keep_limits:
+        for name in ("VENICE_LLM_RATE", "VENICE_IMAGE_RATE", "TAVILY_RATE"):
+            os.environ[name] = "0"
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+async def run_load(agent, queries: list, concurrency: int, style: str) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(query: str):
+        async with semaphore:
+            start = time.perf_counter()
+            result = await agent.process_query(query, style)
+            results.append((time.perf_counter() - start, result))
+
+    await asyncio.gather(*(one(query) for query in queries))
+    return results
+
+
+def summarize(results: list, elapsed: float, args) -> dict:
+    latencies = [latency for latency, _ in results]
+    failures = sum(1 for _, result in results if not result["success"])
+    stages = {}
+    for _, result in results:
+        for stage, value in (result.get("timings") or {}).items():
+            if isinstance(value, (int, float)):
+                stages.setdefault(stage, []).append(value)
+    return {
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "p50_s": round(percentile(latencies, 0.50), 3),
+        "p95_s": round(percentile(latencies, 0.95), 3),
+        "p99_s": round(percentile(latencies, 0.99), 3),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stage_p50_s": {stage: round(statistics.median(values), 3) for stage, values in sorted(stages.items())},
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct", type=int, default=0, help="distinct queries to cycle through (default: all distinct)")
+    parser.add_argument("--warmup", type=int, default=0, help="requests run and discarded before measuring")
+    parser.add_argument("--style", default="3D Model")
+    parser.add_argument("--speculative", action="store_true", help="run the agent in speculative mode")
+    parser.add_argument("--keep-limits", action="store_true", help="keep the configured rate limits")
+    parser.add_argument("--upstream", help="use an already running stub at this URL instead of starting one")
+    parser.add_argument("--json", help="also write the report to this file")
+    stub = StubConfig()
+    parser.add_argument("--llm-latency", default="%s:%s" % stub.llm_latency, help="median:sigma seconds")
+    parser.add_argument("--image-latency", default="%s:%s" % stub.image_latency, help="median:sigma seconds")
+    parser.add_argument("--search-latency", default="%s:%s" % stub.search_latency, help="median:sigma seconds")
+    parser.add_argument("--error-rate", type=float, default=stub.error_rate)
+    parser.add_argument("--completion-words", type=int, default=stub.completion_words)
+    parser.add_argument("--search-bytes", type=int, default=stub.search_bytes)
+    parser.add_argument("--image-bytes", type=int, default=stub.image_bytes)
+    args = parser.parse_args(argv)
+    for name in ("llm_latency", "image_latency", "search_latency"):
+        parse_latency(getattr(args, name))
+    return args
+
+
+def main():
+    args = parse_args()
+    stub = None
+    if args.upstream:
+        url = args.upstream
+    else:
+        stub, url = start_stub(args)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="ava-bench-") as cache_dir:
+            configure_environment(url, args.keep_limits, cache_dir)
+            from app.services.agent_service import DAOAgent
+            from app.services.providers import get_search_service, get_image_service
+            # Per-request log lines would swamp the report
+            for logger in ("ava_lens.trace", "httpx"):
+                logging.getLogger(logger).setLevel(logging.WARNING)
+
+            agent = DAOAgent(get_search_service(), get_image_service(), speculative=args.speculative)
+            distinct = args.distinct or args.requests + args.warmup
+            queries = make_queries(args.requests + args.warmup, distinct)
+
+            async def run():
+                if args.warmup:
+                    await run_load(agent, queries[:args.warmup], args.concurrency, args.style)
+                start = time.perf_counter()
+                results = await run_load(agent, queries[args.warmup:], args.concurrency, args.style)
+                return results, time.perf_counter() - start
+
+            results, elapsed = asyncio.run(run())
+            report = summarize(results, elapsed, args)
+    finally:
+        if stub:
+            stub.terminate()
+            stub.wait()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failures"] == report["requests"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Measure cold-start cost: module import time and first-request setup.
+
+Each import is timed in a fresh interpreter so earlier imports don't hide
+later ones. Run from the repository root:
+
+    python scripts/measure_startup.py
+"""
+import sys
+import json
+import subprocess
+import statistics
+
+RUNS = 5
+
+IMPORT_PROBE = """
+import time, json
+{pre}
+start = time.perf_counter()
+import {module}
+print(json.dumps(time.perf_counter() - start))
+"""
+
+SETUP_PROBE = """
+import time, json, asyncio
+start = time.perf_counter()
+from app.services.providers import get_agent, get_search_service
+imported = time.perf_counter()
+agent = get_agent()
+built = time.perf_counter()
+for _ in range(100):
+    get_agent()
+rerun = (time.perf_counter() - built) / 100
+client_start = time.perf_counter()
+get_search_service().client
+from app.services.http_client import get_http_client
+async def first_client():
+    get_http_client()
+asyncio.run(first_client())
+first_request = time.perf_counter() - client_start
+print(json.dumps({
+    "import": imported - start,
+    "build_services": built - imported,
+    "per_rerun": rerun,
+    "first_request_setup": first_request
+}))
+"""
+
+
+def run_probe(code: str):
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median_ms(samples):
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def main():
+    imports = [
+        ("app.config", ""),
+        ("app.services.agent_service", ""),
+        # Under `streamlit run` streamlit is already loaded, so only count the rest
+        ("main", "import streamlit"),
+        ("streamlit_app", "import streamlit"),
+    ]
+    print("Import time (median of %d fresh interpreters)" % RUNS)
+    for module, pre in imports:
+        samples = [run_probe(IMPORT_PROBE.format(module=module, pre=pre)) for _ in range(RUNS)]
+        print(f"  {module:<30} {median_ms(samples):>8} ms")
+
+    setups = [run_probe(SETUP_PROBE) for _ in range(RUNS)]
+    print("Service setup (median)")
+    for key in ("import", "build_services", "per_rerun", "first_request_setup"):
+        print(f"  {key:<30} {median_ms([s[key] for s in setups]):>8} ms")
+
+
+if __name__ == "__main__":
+    main()
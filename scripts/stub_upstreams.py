@@ -0,0 +1,218 @@
+"""Local stand-in for the Venice and Tavily APIs, for offline benchmarks.
+
+Serves the three endpoints the app calls:
+
+    POST /chat/completions   Venice chat, plain JSON or SSE when "stream" is set
+    POST /image/generate     Venice images, raw PNG bytes or base64 JSON
+    POST /search             Tavily search
+
+Latency is drawn per request from a log-normal distribution given as
+"median:sigma" seconds, a configurable fraction of requests fail with 503,
+and response sizes are configurable. Point the app at it with
+
+    VENICE_API_BASE=http://127.0.0.1:8900 TAVILY_API_BASE=http://127.0.0.1:8900
+
+    python scripts/stub_upstreams.py --port 8900 --llm-latency 0.8:0.4 --error-rate 0.02
+"""
+import re
+import json
+import math
+import time
+import zlib
+import base64
+import random
+import struct
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "governance token treasury proposal community protocol voting members onchain "
+    "decentralized network validators staking liquidity grants delegates multisig"
+).split()
+
+
+def parse_latency(spec: str) -> tuple:
+    """"median:sigma" (seconds) -> (median, sigma); a bare number means fixed latency"""
+    median, _, sigma = spec.partition(":")
+    return float(median), float(sigma or 0)
+
+
+@dataclass
+class StubConfig:
+    llm_latency: tuple = (0.8, 0.4)
+    image_latency: tuple = (6.0, 0.3)
+    search_latency: tuple = (1.2, 0.5)
+    error_rate: float = 0.0
+    completion_words: int = 120
+    search_bytes: int = 4000
+    image_bytes: int = 1_500_000
+    stream_chunk_words: int = 4
+
+    def delay(self, latency: tuple) -> float:
+        median, sigma = latency
+        return median * math.exp(random.gauss(0, sigma)) if sigma else median
+
+
+def make_png(target_bytes: int) -> bytes:
+    """Noise PNG of roughly target_bytes (noise doesn't compress)"""
+    side = max(8, int(math.sqrt(target_bytes / 3)))
+    rng = random.Random(0)
+    rows = b"".join(b"\x00" + rng.randbytes(side * 3) for _ in range(side))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+
+def filler(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: StubConfig = None
+    image: bytes = b""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            latency, handler = self.config.llm_latency, self._chat
+        elif path.endswith("/image/generate"):
+            latency, handler = self.config.image_latency, self._image
+        elif path.endswith("/search"):
+            latency, handler = self.config.search_latency, self._search
+        else:
+            self._send(404, b'{"error": "not found"}')
+            return
+
+        delay = self.config.delay(latency)
+        if handler == self._image:
+            # Render time scales with steps; image_latency is for a 30-step render
+            delay *= body.get("steps", 30) / 30
+        elif handler == self._search and body.get("search_depth") == "basic":
+            # Basic search is the fast tier and returns shorter snippets
+            delay *= 0.4
+        time.sleep(delay)
+        if random.random() < self.config.error_rate:
+            self._send(503, b'{"error": "stub overload"}')
+            return
+        handler(body)
+
+    def _send(self, status: int, data: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chat(self, body: dict):
+        prompt = body["messages"][-1]["content"]
+        if prompt.startswith("Analyze this query about DAOs"):
+            # Answer classification prompts the way the model does, naming the queried DAO
+            match = re.search(r"Query: (.*)", prompt)
+            name = match.group(1).strip() if match else None
+            content = json.dumps({"dao_name": name, "query_keywords": None, "is_dao_query": True, "existing_dao": True})
+        else:
+            content = filler(self.config.completion_words)
+        usage = {"prompt_tokens": len(prompt.split()), "completion_tokens": len(content.split())}
+
+        if not body.get("stream"):
+            message = {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
+            self._send(200, json.dumps(message).encode("utf-8"))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = content.split(" ")
+        step = self.config.stream_chunk_words
+        # Spread the generation time over the stream like a real model
+        pause = self.config.delay(self.config.llm_latency) / max(1, len(words) // step)
+        for index in range(0, len(words), step):
+            text = " ".join(words[index:index + step]) + " "
+            self.wfile.write(f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(pause)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def _image(self, body: dict):
+        if body.get("return_binary"):
+            self._send(200, self.image, "image/png")
+        else:
+            data = json.dumps({"images": [base64.b64encode(self.image).decode("ascii")]})
+            self._send(200, data.encode("utf-8"))
+
+    def _search(self, body: dict):
+        count = body.get("max_results") or 2
+        words = max(1, self.config.search_bytes // count // 10)
+        if body.get("search_depth") == "basic":
+            words = max(1, words // 2)
+        results = [
+            {
+                "url": f"https://example.org/{index}/{body.get('query', '').replace(' ', '-')}",
+                "title": body.get("query"),
+                "content": f"{body.get('query')}. " + filler(words),
+                "score": 1.0 - index / 10
+            }
+            for index in range(count)
+        ]
+        self._send(200, json.dumps({"query": body.get("query"), "results": results}).encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve the stub on a background thread; port 0 picks a free port"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config, "image": make_png(config.image_bytes)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-upstreams", daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--llm-latency", type=parse_latency, default=StubConfig.llm_latency, help="median:sigma seconds")
+    parser.add_argument("--image-latency", type=parse_latency, default=StubConfig.image_latency, help="median:sigma seconds")
+    parser.add_argument("--search-latency", type=parse_latency, default=StubConfig.search_latency, help="median:sigma seconds")
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate, help="fraction of requests answered with 503")
+    parser.add_argument("--completion-words", type=int, default=StubConfig.completion_words)
+    parser.add_argument("--search-bytes", type=int, default=StubConfig.search_bytes)
+    parser.add_argument("--image-bytes", type=int, default=StubConfig.image_bytes)
+    return parser.parse_args(argv)
+
+
+def config_from_args(args) -> StubConfig:
+    return StubConfig(
+        llm_latency=args.llm_latency,
+        image_latency=args.image_latency,
+        search_latency=args.search_latency,
+        error_rate=args.error_rate,
+        completion_words=args.completion_words,
+        search_bytes=args.search_bytes,
+        image_bytes=args.image_bytes
+    )
+
+
+def main():
+    args = parse_args()
+    server = start_stub_server(config_from_args(args), args.host, args.port)
+    print(f"Stub Venice/Tavily listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import streamlit as st
-from app.services.image_service import ImageService, VeniceAiModelStyles
-from PIL import Image
+from app.config import IMAGE_RENDITIONS
+from app.services.image_service import VeniceAiModelStyles
+from app.services.providers import get_image_service
+from app.services.result_store import get_result_store
+from app.utils.async_runner import run_sync
+from app.utils.image_renditions import make_renditions
 
 def setup_page_config():
     st.set_page_config(
@@ -10,6 +14,16 @@ def setup_page_config():
         initial_sidebar_state="collapsed"
     )
 
+def render_image(image: bytes, renditions: dict):
+    # Center and display the generated image
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if renditions:
+            st.image(renditions["display"], use_column_width=True)
+        else:
+            st.image(image, use_column_width=True, clamp=True, output_format="PNG")
+        st.download_button("Download original", data=image, file_name="avalens.png", mime="image/png")
+
 def apply_custom_css():
     st.markdown("""
         <style>
@@ -81,6 +95,8 @@ def main():
     setup_page_config()
     apply_custom_css()
 
+    from PIL import Image
+
     # Load and display avatar with title
     avatar = Image.open('app/ava_lens.jpg')
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -126,16 +142,21 @@ def main():
             return
             
         with st.spinner("🎨 Creating your masterpiece..."):
-            image_service = ImageService()
-            image = image_service.generate_image(prompt, selected_style)
+            image_service = get_image_service()
+            image = run_sync(image_service.generate_image(prompt, selected_style))
             
             if image:
-                # Center and display the generated image
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col2:
-                    st.image(image, use_column_width=True, clamp=True, output_format="PNG")
+                # The Pillow stage is optional, as in main.py
+                renditions = make_renditions(image) if IMAGE_RENDITIONS else None
+                # Kept as handles so the rerun from the download button can redraw it
+                st.session_state["last_image"] = get_result_store().stash({"image": image, "image_renditions": renditions})
+                render_image(image, renditions)
             else:
                 st.error("Failed to generate image. Please try again.")
+    elif "last_image" in st.session_state:
+        saved = get_result_store().load(st.session_state["last_image"])
+        if saved["image"]:
+            render_image(saved["image"], saved["image_renditions"])
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,28 @@
+from app.services.query_cache import QueryCache
+from app.services.result_store import ResultStore
+
+
+def make_cache():
+    return QueryCache(max_entries=16, max_bytes=1 << 20, threshold=0.8, ttl=60, results=ResultStore())
+
+
+def answer(text):
+    return {"success": True, "response": text, "image": None}
+
+
+def test_different_number_is_not_a_near_duplicate():
+    cache = make_cache()
+    cache.set("Gitcoin DAO grants round 18", "3D Model", answer("round 18"))
+    assert cache.get("Gitcoin DAO grants round 19", "3D Model") is None
+
+
+def test_extra_qualifier_is_not_a_near_duplicate():
+    cache = make_cache()
+    cache.set("Tell me about Uniswap governance", "3D Model", answer("governance"))
+    assert cache.get("Uniswap governance v2", "3D Model") is None
+
+
+def test_spacing_variant_is_a_near_duplicate():
+    cache = make_cache()
+    cache.set("Tell me about MakerDAO", "3D Model", answer("maker"))
+    assert cache.get("Tell me about Maker DAO", "3D Model")["response"] == "maker"